@@ -0,0 +1,54 @@
+"""how long each entry point takes to import, in a fresh interpreter each time
+
+The heavy dependencies are in there for comparison, the app should only pay for
+them once a worker process imports `memes_api.main`.
+
+    python benchmarks/import_time.py [runs]
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from typing import List
+
+TARGETS = [
+    # what `memes-healthcheck` imports on every container probe
+    "memes_api.healthcheck",
+    # what `memes-api` imports before handing over to uvicorn
+    "memes_api.server",
+    # what each worker process imports
+    "memes_api.main",
+    "fastapi",
+    "aioboto3",
+    "PIL.Image",
+    "jinja2",
+    "uvicorn",
+]
+
+
+def time_import(module: str, runs: int) -> List[float]:
+    """wall-clock seconds for `python -c "import module"`, minus an empty interpreter start"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    """times each target and prints the medians"""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    # warm up the bytecode caches so the first target isn't penalised
+    for module in TARGETS:
+        time_import(module, 1)
+    baseline = statistics.median(time_import("sys", runs))
+    print(f"{'interpreter startup':24} {baseline * 1000:7.1f}ms")
+    for module in TARGETS:
+        median = statistics.median(time_import(module, runs))
+        print(f"{module:24} {(median - baseline) * 1000:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""compares peak RSS for a cold thumbnail, old buffered pipeline vs the streaming one
+
+Each run happens in a fresh process, so the numbers don't pollute each other.
+
+    python benchmarks/thumbnail_memory.py [width] [height]
+"""
+
+import asyncio
+import multiprocessing
+import resource
+import sys
+import tempfile
+from hashlib import sha1
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from PIL import Image
+
+from memes_api.thumbnails import READ_CHUNK_SIZE, generate_thumbnail, read_source
+
+
+class FakeBody:
+    """pretends to be an aiobotocore StreamingBody"""
+
+    def __init__(self, content: bytes) -> None:
+        self.reader = BytesIO(content)
+
+    async def read(self, amt: int = -1) -> bytes:
+        """read(-1) collects the chunks then joins them, like aiohttp does"""
+        if amt != -1:
+            return self.reader.read(amt)
+        chunks: List[bytes] = []
+        while chunk := self.reader.read(READ_CHUNK_SIZE):
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+
+def make_source(width: int, height: int, source_path: Path) -> None:
+    """a big, hard to compress JPEG"""
+    noise = Image.effect_noise((width, height), 100).convert("RGB")
+    noise.save(source_path, "JPEG", quality=95)
+
+
+def buffered_pipeline(content: bytes) -> None:
+    """how the thumbnail route used to work"""
+
+    async def run() -> None:
+        source = await FakeBody(content).read()
+        tmpstorage = BytesIO()
+        with Image.open(BytesIO(source)) as tempimage:
+            tempimage.thumbnail((200, 200))
+            tempimage = tempimage.convert("RGB")
+            tempimage.save(tmpstorage, "JPEG")
+        tmpstorage.seek(0)
+        sha1(tmpstorage.read()).hexdigest()
+        tmpstorage.seek(0)
+        # upload_fileobj reads it back, then the response copies it again
+        tmpstorage.read()
+        tmpstorage.seek(0)
+        BytesIO(tmpstorage.read())
+
+    asyncio.run(run())
+
+
+def streaming_pipeline(content: bytes) -> None:
+    """the current thumbnail route"""
+
+    async def run() -> None:
+        source = await read_source(FakeBody(content), max_bytes=len(content))
+        thumbnail = generate_thumbnail(source)
+        source.close()
+        thumbnail.reader.getbuffer()
+
+    asyncio.run(run())
+
+
+def measure(
+    pipeline: Callable[[bytes], None], source_path: Path, results: Dict[str, Any]
+) -> None:
+    """runs in a child process, reports the peak RSS the pipeline added"""
+    content = source_path.read_bytes()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    pipeline(content)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results[pipeline.__name__] = {
+        "source_bytes": len(content),
+        "peak_kib_added": peak - baseline,
+    }
+
+
+def main() -> None:
+    """run each pipeline in its own process and print the results"""
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tempdir, context.Manager() as manager:
+        source_path = Path(tempdir) / "source.jpg"
+        # children inherit the parent's peak RSS, so keep the parent small
+        # by making the source image in another process
+        jobs: List[Tuple[Callable[..., None], Tuple[Any, ...]]] = [
+            (make_source, (width, height, source_path))
+        ]
+        results = manager.dict()
+        for pipeline in (buffered_pipeline, streaming_pipeline):
+            jobs.append((measure, (pipeline, source_path, results)))
+        for target, args in jobs:
+            process = context.Process(target=target, args=args)
+            process.start()
+            process.join()
+        for name, result in results.items():
+            print(
+                f"{name:20} source={result['source_bytes'] / 1024 / 1024:.1f}MiB "
+                f"peak RSS added={result['peak_kib_added'] / 1024:.1f}MiB"
+            )
+
+
+if __name__ == "__main__":
+    main()
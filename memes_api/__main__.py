@@ -1,6 +1,6 @@
 """CLI interface / main interface to memes-api"""
 
-from memes_api import cli
+from memes_api.server import cli
 
 if __name__ == "__main__":
     cli()
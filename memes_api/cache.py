@@ -0,0 +1,217 @@
+"""cache backends for the image listing
+
+The in-process backend keeps the listing in memory, which is fine for a single
+worker. The file backend keeps it in a file that every worker on the host can
+read, and uses an flock so only one worker at a time refreshes it from S3.
+Unless `cache_file` is set, that file is per user and per bucket, so separate
+deployments on one host don't share a listing.
+
+LRUCache is a plain bounded per-process cache for things derived from it.
+"""
+
+import asyncio
+import fcntl
+from hashlib import sha1
+import logging
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Hashable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Generic, List, Optional, Tuple, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from .config import MemeConfig, worker_count
+
+KeyT = TypeVar("KeyT", bound=Hashable)
+ValueT = TypeVar("ValueT")
+
+
+class CacheEntry(BaseModel):
+    """an image listing and when it was pulled from the bucket"""
+
+    timestamp: datetime
+    images: List[str]
+
+
+class CacheBackend(ABC):
+    """somewhere to keep the image listing"""
+
+    @abstractmethod
+    def get(self) -> Optional[CacheEntry]:
+        """get the stored entry, or None if there isn't one"""
+
+    @abstractmethod
+    def set(self, entry: CacheEntry) -> None:
+        """store an entry"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """drop the stored entry"""
+
+    @abstractmethod
+    def lock(self) -> AbstractAsyncContextManager[None]:
+        """held while refreshing the listing, so only one refresh runs at a time"""
+
+
+class InProcessCacheBackend(CacheBackend):
+    """keeps the listing in this process"""
+
+    def __init__(self) -> None:
+        self.entry: Optional[CacheEntry] = None
+        self._lock = asyncio.Lock()
+
+    def get(self) -> Optional[CacheEntry]:
+        return self.entry
+
+    def set(self, entry: CacheEntry) -> None:
+        self.entry = entry
+
+    def clear(self) -> None:
+        self.entry = None
+
+    def lock(self) -> AbstractAsyncContextManager[None]:
+        return self._lock_context()
+
+    @asynccontextmanager
+    async def _lock_context(self) -> AsyncIterator[None]:
+        async with self._lock:
+            yield
+
+
+class FileCacheBackend(CacheBackend):
+    """keeps the listing in a file shared by every worker on the host"""
+
+    def __init__(self, path: Path, poll_interval: float = 0.05) -> None:
+        self.path = path
+        self.lock_path = path.with_name(f"{path.name}.lock")
+        self.poll_interval = poll_interval
+        # the parsed file, keyed by (mtime, size) so we only re-parse when it changes
+        self._loaded: Optional[Tuple[Tuple[int, int], CacheEntry]] = None
+
+    def get(self) -> Optional[CacheEntry]:
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        if self._loaded is not None and self._loaded[0] == key:
+            return self._loaded[1]
+        try:
+            entry = CacheEntry.model_validate_json(self.path.read_bytes())
+        except (OSError, ValidationError):
+            # mid-clear or corrupt, either way the caller will refresh it
+            return None
+        self._loaded = (key, entry)
+        return entry
+
+    def set(self, entry: CacheEntry) -> None:
+        # write then rename, so readers never see a partial file
+        tmpfile = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        try:
+            self.path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            tmpfile.write_text(entry.model_dump_json(), encoding="utf-8")
+            os.replace(tmpfile, self.path)
+        except OSError as error:
+            # the caller still has the listing, it just won't be shared
+            logging.error("Failed to write the listing cache %s: %s", self.path, error)
+
+    def clear(self) -> None:
+        try:
+            self.path.unlink(missing_ok=True)
+        except OSError as error:
+            logging.error("Failed to clear the listing cache %s: %s", self.path, error)
+        self._loaded = None
+
+    def lock(self) -> AbstractAsyncContextManager[None]:
+        return self._lock_context()
+
+    @asynccontextmanager
+    async def _lock_context(self) -> AsyncIterator[None]:
+        try:
+            self.lock_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            lock_handle = self.lock_path.open("a", encoding="utf-8")
+        except OSError as error:
+            logging.error(
+                "Failed to open the listing cache lock %s, refreshing without it: %s",
+                self.lock_path,
+                error,
+            )
+            yield
+            return
+        with lock_handle:
+            while True:
+                try:
+                    fcntl.flock(lock_handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    # someone else is refreshing, don't block the event loop waiting
+                    await asyncio.sleep(self.poll_interval)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_handle.fileno(), fcntl.LOCK_UN)
+
+
+def default_cache_file(meme_config: MemeConfig) -> Path:
+    """where the file backend keeps the listing if `cache_file` isn't set
+
+    this is in the user's runtime dir (or a per-user dir in the temp dir), and named
+    after the endpoint and bucket so different deployments get different files
+    """
+    runtime_dir = os.getenv("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        cache_dir = Path(runtime_dir) / "memes-api"
+    else:
+        cache_dir = Path(tempfile.gettempdir()) / f"memes-api-{os.getuid()}"
+    source = f"{meme_config.endpoint_url or ''}|{meme_config.bucket}"
+    return cache_dir / f"listing-{sha1(source.encode('utf-8')).hexdigest()[:16]}.json"
+
+
+def cache_backend_from_config(meme_config: MemeConfig) -> CacheBackend:
+    """builds the cache backend the config asks for, sharing the listing if there's more than one worker"""
+    backend = meme_config.cache_backend
+    if backend is None:
+        backend = "file" if worker_count(meme_config) > 1 else "memory"
+    if backend == "file":
+        if meme_config.cache_file is not None:
+            return FileCacheBackend(Path(meme_config.cache_file).expanduser())
+        return FileCacheBackend(default_cache_file(meme_config))
+    return InProcessCacheBackend()
+
+
+class LRUCache(Generic[KeyT, ValueT]):
+    """a bounded, per-process cache which drops the least recently used entry when it's full"""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.entries: OrderedDict[KeyT, ValueT] = OrderedDict()
+
+    def get(self, key: KeyT) -> Optional[ValueT]:
+        """get an entry, or None if it's not there"""
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: KeyT, value: ValueT) -> None:
+        """store an entry, evicting the oldest if we're full"""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def pop(self, key: KeyT) -> Optional[ValueT]:
+        """drop an entry, returning it if it was there"""
+        return self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        """drop everything"""
+        self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
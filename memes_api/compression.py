@@ -0,0 +1,194 @@
+"""content-type aware response compression
+
+Only text-ish responses (html, css, js, json, svg) are compressed, images and
+anything already carrying a Content-Encoding are passed straight through
+untouched, so they keep streaming and keep their Content-Length.
+"""
+
+import zlib
+from hashlib import sha1
+from typing import Dict, List, Optional, Protocol
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import zstandard
+
+from .utils import choose_encoding
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/x-ndjson",
+    "application/xml",
+    "image/svg+xml",
+)
+
+
+def available_encodings() -> List[str]:
+    """the encodings we can produce, in order of preference"""
+    return ["br", "zstd", "gzip"]
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """if it's worth compressing a response of this type"""
+    if content_type is None:
+        return False
+    return content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(content: bytes, encoding: str, best: bool = False) -> bytes:
+    """compress a whole body in one go, `best` trades CPU for size for things that are compressed once and cached"""
+    if encoding == "br":
+        return bytes(brotli.compress(content, quality=9 if best else 5))
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=12 if best else 3).compress(content)
+    if encoding == "gzip":
+        compressor = zlib.compressobj(9 if best else 6, zlib.DEFLATED, 31)
+        return compressor.compress(content) + compressor.flush()
+    raise ValueError(f"Unsupported encoding {encoding}")
+
+
+class StreamCompressor(Protocol):
+    """incremental compressor"""
+
+    def compress(self, data: bytes) -> bytes:
+        """compress a chunk, returning whatever output is ready"""
+
+    def flush(self) -> bytes:
+        """finish the stream"""
+
+
+class _BrotliStream:
+    """gives brotli's Compressor the same interface as zlib's"""
+
+    def __init__(self) -> None:
+        self.compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data: bytes) -> bytes:
+        """compress a chunk"""
+        return bytes(self.compressor.process(data))
+
+    def flush(self) -> bytes:
+        """finish the stream"""
+        return bytes(self.compressor.finish())
+
+
+def stream_compressor(encoding: str) -> StreamCompressor:
+    """an incremental compressor, for bodies which arrive in chunks"""
+    if encoding == "br":
+        return _BrotliStream()
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    if encoding == "gzip":
+        return zlib.compressobj(6, zlib.DEFLATED, 31)
+    raise ValueError(f"Unsupported encoding {encoding}")
+
+
+class PrecompressedBody:
+    """a response body, plus compressed copies made the first time each encoding is asked for"""
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+        self.digest = sha1(content).hexdigest()
+        self.encoded: Dict[str, bytes] = {}
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        """picks the encoding to send, None if it should go uncompressed"""
+        return choose_encoding(accept_encoding, available_encodings())
+
+    def body(self, encoding: Optional[str]) -> bytes:
+        """the body in the given encoding"""
+        if encoding is None:
+            return self.content
+        if encoding not in self.encoded:
+            self.encoded[encoding] = compress(self.content, encoding, best=True)
+        return self.encoded[encoding]
+
+    def etag(self, encoding: Optional[str]) -> str:
+        """a strong etag for the body in the given encoding"""
+        if encoding is None:
+            return f'"{self.digest}"'
+        return f'"{self.digest}-{encoding}"'
+
+
+class SelectiveCompressionMiddleware:  # pylint: disable=too-few-public-methods
+    """compresses text responses with the best encoding the client accepts"""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(
+            Headers(scope=scope).get("accept-encoding"), available_encodings()
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:  # pylint: disable=too-few-public-methods
+    """wraps `send` for a single response"""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int) -> None:
+        self.downstream = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[StreamCompressor] = None
+
+    async def send(self, message: Message) -> None:
+        """handles each ASGI message for the response"""
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            if "content-encoding" in headers or not is_compressible(
+                headers.get("content-type")
+            ):
+                self.passthrough = True
+                await self.downstream(message)
+            else:
+                # hold the headers until we've seen the body
+                self.start_message = message
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.downstream(message)
+            return
+
+        assert self.start_message is not None
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if not more_body:
+                # the whole body in one message, the common case
+                if len(body) >= self.minimum_size:
+                    body = compress(body, self.encoding)
+                    headers["Content-Encoding"] = self.encoding
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                await self.downstream(self.start_message)
+                await self.downstream({**message, "body": body})
+                return
+            # streaming, compress as it goes
+            self.compressor = stream_compressor(self.encoding)
+            del headers["Content-Length"]
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            await self.downstream(self.start_message)
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.flush()
+        await self.downstream(
+            {"type": "http.response.body", "body": chunk, "more_body": more_body}
+        )
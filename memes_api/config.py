@@ -1,7 +1,8 @@
 """config things"""
 
 from functools import lru_cache
-from typing import Optional
+import os
+from typing import List, Literal, Optional
 from pathlib import Path
 
 from pydantic import BaseModel
@@ -17,6 +18,55 @@ class MemeConfig(BaseModel):
     baseurl: str
     endpoint_url: Optional[str]
 
+    # how long the bucket listing is cached for
+    cache_max_age_seconds: int = 900
+    # "memory" keeps the listing per-process, "file" shares it between workers on the host
+    # defaults to "file" when there's more than one worker, "memory" otherwise
+    cache_backend: Optional[Literal["memory", "file"]] = None
+    # where the "file" cache backend keeps the listing, defaults to a per-user file named for the bucket
+    cache_file: Optional[str] = None
+
+    # server tuning, the CLI options override these
+    # number of worker processes, defaults to the number of CPUs available
+    workers: Optional[int] = None
+    loop: Literal["auto", "asyncio", "uvloop"] = "auto"
+    http: Literal["auto", "h11", "httptools"] = "auto"
+    timeout_keep_alive: int = 5
+    # max concurrent connections/tasks per worker before returning 503
+    limit_concurrency: Optional[int] = None
+    timeout_graceful_shutdown: Optional[int] = None
+    backlog: int = 2048
+    # threads per worker for generating thumbnails, also how many originals a worker holds in memory at once
+    thumbnail_threads: int = 2
+    # originals bigger than this won't be thumbnailed
+    thumbnail_max_source_bytes: int = 25 * 1024 * 1024
+    # how many pages of thumbnails each worker keeps ready to go
+    thumbnail_bundle_cache_size: int = 64
+    # how many rendered /image_info pages each worker keeps
+    image_info_cache_size: int = 1024
+    # how long a cached /image_info page is served before checking the original hasn't changed
+    image_info_recheck_seconds: int = 60
+
+    # per-client-IP token buckets, run with --proxy-headers behind a proxy
+    # the rates, bursts and s3_max_concurrency are for the whole host, each worker gets an even share
+    rate_limit_enabled: bool = True
+    # charged on every request to an image route
+    rate_limit_cached_per_second: float = 20.0
+    rate_limit_cached_burst: int = 100
+    # charged when a request has to generate a thumbnail or pull an original from S3
+    rate_limit_cold_per_second: float = 1.0
+    rate_limit_cold_burst: int = 30
+    # how many clients each worker tracks before forgetting the least recently seen
+    rate_limit_max_clients: int = 10000
+    # max S3 object fetches in flight, and how long to queue for one before returning 503
+    s3_max_concurrency: int = 32
+    s3_queue_timeout_seconds: float = 10.0
+
+    # how often each worker checks the bucket is reachable, for /ready
+    readiness_check_interval_seconds: float = 15.0
+    # /ready reports not ready if more thumbnail jobs than this are waiting for a thread
+    readiness_max_thumbnail_queue: int = 32
+
     def load_from_file(self, filepath: Path) -> None:
         """load from a file"""
         newvals = MemeConfig.model_validate_json(filepath.read_text(encoding="utf-8"))
@@ -26,13 +76,13 @@ class MemeConfig(BaseModel):
     @classmethod
     def default(cls) -> "MemeConfig":
         """Load config from the default locations"""
-        for testpath in CONFIG_FILES:
+        for testpath in config_search_paths():
             filepath = Path(testpath).expanduser().resolve()
             if filepath.exists():
                 return MemeConfig.model_validate_json(
                     filepath.read_text(encoding="utf-8")
                 )
-        raise FileNotFoundError(f"Couldn't find config at {CONFIG_FILES}")
+        raise FileNotFoundError(f"Couldn't find config at {config_search_paths()}")
 
 
 CONFIG_FILES = [
@@ -41,6 +91,27 @@ CONFIG_FILES = [
     "/etc/memes-api.json",
 ]
 
+# set by the CLI so worker processes load the same config file as the parent
+CONFIG_ENV_VAR = "MEMES_API_CONFIG"
+# set by the CLI so each worker process knows how many of them are sharing the host
+WORKERS_ENV_VAR = "MEMES_API_WORKERS"
+
+
+def config_search_paths() -> List[str]:
+    """the config file set in the environment, if any, then the default locations"""
+    env_config = os.getenv(CONFIG_ENV_VAR)
+    if env_config:
+        return [env_config, *CONFIG_FILES]
+    return CONFIG_FILES
+
+
+def worker_count(meme_config: MemeConfig) -> int:
+    """how many worker processes are serving, as started by the CLI, otherwise from the config"""
+    env_workers = os.getenv(WORKERS_ENV_VAR)
+    if env_workers:
+        return max(1, int(env_workers))
+    return meme_config.workers or 1
+
 
 @lru_cache()
 def meme_config_load(
@@ -48,6 +119,7 @@ def meme_config_load(
 ) -> MemeConfig:
     """Config loader, returns a pydantic object, will try the following in order, returning the result of parsing the first one found.
 
+    - the file named in the `MEMES_API_CONFIG` environment variable
     - `memes-api.json`
     - `~/.config/memes-api.json`
     - `/etc/memes-api.json`
@@ -59,8 +131,8 @@ def meme_config_load(
         if filepath.exists():
             return MemeConfig.model_validate_json(filepath.read_text(encoding="utf-8"))
         raise FileNotFoundError(f"Couldn't find config at {filepath}")
-    for testpath in CONFIG_FILES:
+    for testpath in config_search_paths():
         filepath = Path(testpath).expanduser().resolve()
         if filepath.exists():
             return MemeConfig.model_validate_json(filepath.read_text(encoding="utf-8"))
-    raise FileNotFoundError(f"Couldn't find config at {CONFIG_FILES}")
+    raise FileNotFoundError(f"Couldn't find config at {config_search_paths()}")
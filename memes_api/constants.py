@@ -2,3 +2,7 @@
 
 THUMBNAIL_BUCKET_PREFIX = "thumbs/"
 THUMBNAIL_DIMENSIONS = (200, 200)
+# matches imagesPerPage in memesapi.js
+THUMBNAILS_PER_PAGE = 15
+# /thumbnails errors which might go away if you ask again, bundles with these aren't cached
+TRANSIENT_BUNDLE_ERRORS = ("failed to load", "rate limited", "overloaded")
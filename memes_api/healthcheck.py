@@ -1,29 +1,46 @@
-""" does the healthcheck, doesn't need curl """
+""" does the healthcheck, doesn't need curl
 
+This runs on every container health probe, so it sticks to the standard library
+and doesn't import the app. `--ready` checks `/ready` instead of `/up`, which
+fails if the worker that answers says it's degraded.
+"""
+
+import argparse
 import sys
+from typing import List, Optional
 
 import urllib.request
 import urllib.error
 
-import click
-
 DEFAULT_URL = "http://localhost:11707/up"
+DEFAULT_READY_URL = "http://localhost:11707/ready"
 
 
-@click.command()
-@click.argument("url", default=DEFAULT_URL)
-def cli(url: str = DEFAULT_URL) -> None:
+def cli(args: Optional[List[str]] = None) -> None:
     """Checks the URL works"""
+    parser = argparse.ArgumentParser(description="Checks the URL works")
+    parser.add_argument("url", nargs="?", help=f"defaults to {DEFAULT_URL}")
+    parser.add_argument(
+        "--ready",
+        action="store_true",
+        help=f"check readiness instead, defaults to {DEFAULT_READY_URL}",
+    )
+    parser.add_argument("--timeout", type=float, default=5.0, help="in seconds")
+    options = parser.parse_args(args)
+    url = options.url
+    if url is None:
+        url = DEFAULT_READY_URL if options.ready else DEFAULT_URL
     try:
-        with urllib.request.urlopen(url) as response:
+        # a 503 from /ready raises HTTPError, which is a URLError
+        with urllib.request.urlopen(url, timeout=options.timeout) as response:
             result = response.read().decode("utf-8")
-            if result == "OK":
+            if options.ready or result == "OK":
                 print("OK")
                 sys.exit(0)
             else:
                 print(f"Failed to get 'OK' response: {result}")
                 sys.exit(1)
-    except urllib.error.URLError as error_message:
+    except (urllib.error.URLError, TimeoutError) as error_message:
         print(f"Error: {error_message}", file=sys.stderr)
         sys.exit(1)
 
@@ -10,6 +10,8 @@ const app = Vue.createApp({
     data: function(){
         return {
         images : [],
+        // image name -> thumbnail url, filled in a page at a time by getThumbnails
+        thumbnails: {},
         search: '',
         currentPage: 1, // default to the first page
         button_md: false,
@@ -76,6 +78,47 @@ const app = Vue.createApp({
                 this.images = res.data.images;
             });
         },
+        getThumbnails: function(images) {
+            // one request for the whole page, rather than one per thumbnail
+            const wanted = images.filter(image => !(image in this.thumbnails));
+            if (wanted.length == 0) {
+                return;
+            }
+            let qp = new URLSearchParams();
+            wanted.forEach(image => qp.append("image", image));
+            axios.get(
+                "/thumbnails?"+qp.toString(),
+                {responseType: "text"},
+            ).then(res => {
+                res.data.split("\n").forEach(line => {
+                    if (line == "") {
+                        return;
+                    }
+                    const item = JSON.parse(line);
+                    if (item.thumbnail) {
+                        this.thumbnails[item.image] = "data:image/jpeg;base64,"+item.thumbnail;
+                    } else if (item.error == "rate limited" || item.error == "overloaded") {
+                        // asking for it on its own would be turned away too, leave it
+                        // out so it's asked for again next time the page is shown
+                        return;
+                    } else if (item.error == "not found" || item.error == "failed to thumbnail") {
+                        // asking again won't help, leave it blank
+                        this.thumbnails[item.image] = "";
+                    } else {
+                        this.thumbnails[item.image] = "/thumbnail/"+item.image;
+                    }
+                });
+            }).catch(error => {
+                if (error.response && [429, 503].includes(error.response.status)) {
+                    // same as above, one at a time would be turned away too
+                    return;
+                }
+                // fall back to fetching them one at a time
+                wanted.forEach(image => {
+                    this.thumbnails[image] = "/thumbnail/"+image;
+                });
+            });
+        },
         updateUrl() {
             let qp = new URLSearchParams();
             if(this.search !== '') {
@@ -127,6 +170,9 @@ const app = Vue.createApp({
 
     },
     watch: {
+        paginatedImages(images) {
+            this.getThumbnails(images);
+        },
         search() {
             if (this.currentPage > this.pageCount) {
                 console.log("Setting page to 1");
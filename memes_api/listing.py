@@ -0,0 +1,75 @@
+"""encodings for the /allimages listing
+
+Clients which send `Accept: application/vnd.memes-api.imagelist+msgpack` get a
+front-coded listing packed with msgpack instead of JSON. Bucket keys come back
+sorted and share long prefixes, so each key is sent as the number of leading
+characters it shares with the previous key, plus the rest of the key:
+
+    {"v": 1, "shared": [0, 6, ...], "suffixes": ["memes/cat.jpg", "dog.png", ...]}
+
+and decodes as `key[i] = key[i - 1][:shared[i]] + suffixes[i]`.
+"""
+
+from typing import List, Optional, Tuple
+
+import msgpack
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/vnd.memes-api.imagelist+msgpack"
+FRONT_CODING_VERSION = 1
+
+
+def front_encode(keys: List[str]) -> Tuple[List[int], List[str]]:
+    """splits each key into the length of the prefix it shares with the previous key and the remaining suffix"""
+    shared: List[int] = []
+    suffixes: List[str] = []
+    previous = ""
+    for key in keys:
+        common = 0
+        limit = min(len(previous), len(key))
+        while common < limit and previous[common] == key[common]:
+            common += 1
+        shared.append(common)
+        suffixes.append(key[common:])
+        previous = key
+    return shared, suffixes
+
+
+def front_decode(shared: List[int], suffixes: List[str]) -> List[str]:
+    """the inverse of front_encode"""
+    keys: List[str] = []
+    previous = ""
+    for common, suffix in zip(shared, suffixes, strict=True):
+        previous = previous[:common] + suffix
+        keys.append(previous)
+    return keys
+
+
+def pack_listing(keys: List[str]) -> bytes:
+    """the front-coded, msgpack'd listing"""
+    shared, suffixes = front_encode(keys)
+    return bytes(
+        msgpack.packb(
+            {"v": FRONT_CODING_VERSION, "shared": shared, "suffixes": suffixes}
+        )
+    )
+
+
+def unpack_listing(content: bytes) -> List[str]:
+    """decodes what pack_listing produced"""
+    data = msgpack.unpackb(content)
+    if data.get("v") != FRONT_CODING_VERSION:
+        raise ValueError(f"Unsupported listing version {data.get('v')}")
+    return front_decode(data["shared"], data["suffixes"])
+
+
+def listing_media_type(accept: Optional[str]) -> str:
+    """picks JSON unless the client explicitly asked for the compact encoding"""
+    if accept is not None:
+        for item in accept.split(","):
+            media_type, _, params = item.strip().partition(";")
+            if media_type.strip().lower() == MSGPACK_MEDIA_TYPE and (
+                params.strip().replace(" ", "") not in ("q=0", "q=0.0")
+            ):
+                return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
@@ -0,0 +1,799 @@
+"""the memes API app, imported by uvicorn in each worker"""
+
+import asyncio
+from base64 import b64encode
+from contextlib import asynccontextmanager
+from datetime import UTC, datetime, timedelta
+from functools import lru_cache
+from hashlib import sha1
+
+from io import BytesIO
+import json
+import logging
+import math
+import time
+from typing import Annotated, Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+import sys
+from urllib.parse import quote
+
+from botocore.exceptions import ClientError
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import (
+    HTMLResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
+
+from jinja2 import Environment, PackageLoader, select_autoescape
+import jinja2.exceptions
+from pydantic import BaseModel, ConfigDict
+from starlette.background import BackgroundTask
+
+from .cache import (
+    CacheBackend,
+    CacheEntry,
+    InProcessCacheBackend,
+    LRUCache,
+    cache_backend_from_config,
+)
+from .ratelimit import Overloaded, RateLimited
+from .readiness import ListingStatus, ReadinessReport, S3Monitor, ThumbnailStatus
+from .sessions import get_aioboto3_session
+from .compression import PrecompressedBody, SelectiveCompressionMiddleware
+from .config import MemeConfig, worker_count
+from .constants import (
+    THUMBNAIL_BUCKET_PREFIX,
+    THUMBNAIL_DIMENSIONS,
+    THUMBNAILS_PER_PAGE,
+    TRANSIENT_BUNDLE_ERRORS,
+)
+from .listing import (
+    JSON_MEDIA_TYPE,
+    MSGPACK_MEDIA_TYPE,
+    listing_media_type,
+    pack_listing,
+)
+from .thumbnails import (
+    SourceTooLarge,
+    ThumbnailData as ThumbnailData,
+    generate_thumbnail as generate_thumbnail,
+    read_source,
+)
+from .static import get_static_manifest, static_response, static_url
+from .utils import default_page_render_context, etag_matches, save_thumbnail
+from .worker import worker_resources
+
+
+meme_config = MemeConfig.default()
+# the limits apply even if the lifespan hook doesn't run
+worker_resources.configure(meme_config)
+
+
+@lru_cache
+def get_jinja2_env() -> Environment:
+    """the template environment, built once per worker"""
+    jinja2_env = Environment(
+        loader=PackageLoader(package_name="memes_api", package_path="./templates"),
+        autoescape=select_autoescape(),
+    )
+    jinja2_env.globals["static_url"] = static_url
+    return jinja2_env
+
+
+@lru_cache
+def template_version() -> str:
+    """a hash of the templates, so cached pages get re-rendered when they change"""
+    jinja2_env = get_jinja2_env()
+    digest = sha1()
+    if jinja2_env.loader is not None:
+        for name in jinja2_env.list_templates():
+            source, _, _ = jinja2_env.loader.get_source(jinja2_env, name)
+            digest.update(name.encode("utf-8"))
+            digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+    """runs in each worker process, so caches and pools aren't shared across forks"""
+    meme_cache.max_age = timedelta(seconds=meme_config.cache_max_age_seconds)
+    meme_cache.backend = cache_backend_from_config(meme_config)
+    thumbnail_bundles.max_entries = meme_config.thumbnail_bundle_cache_size
+    image_info_pages.max_entries = meme_config.image_info_cache_size
+    worker_resources.start(meme_config, worker_count(meme_config))
+    s3_monitor.interval = meme_config.readiness_check_interval_seconds
+    s3_monitor.start(check_bucket)
+    # index, hash and compress the static files before taking requests
+    get_static_manifest()
+    try:
+        yield
+    finally:
+        await s3_monitor.stop()
+        worker_resources.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(SelectiveCompressionMiddleware, minimum_size=1000)
+
+
+def client_address(request: Request) -> Optional[str]:
+    """the client's IP, which uvicorn takes from X-Forwarded-For when running with --proxy-headers"""
+    if request.client is None:
+        return None
+    return request.client.host
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(_request: Request, error: RateLimited) -> Response:
+    """the client's used up its budget"""
+    return PlainTextResponse(
+        "Too many requests, slow down!",
+        status_code=429,
+        headers={"Retry-After": str(math.ceil(error.retry_after))},
+    )
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(_request: Request, error: Overloaded) -> Response:
+    """too many S3 fetches already queued"""
+    return PlainTextResponse(
+        "Too busy right now, try again shortly",
+        status_code=503,
+        headers={"Retry-After": str(math.ceil(error.retry_after))},
+    )
+
+
+class ImageList(BaseModel):
+    """list of images from the filesystem"""
+
+    images: List[str]
+
+
+class MemeCache:
+    """cache for the meme data"""
+
+    def __init__(
+        self, max_age: timedelta, backend: Optional[CacheBackend] = None
+    ) -> None:
+        self.max_age = max_age
+        self.backend = backend if backend is not None else InProcessCacheBackend()
+        # the serialised listing per media type, keyed by the timestamp of the entry it came from
+        self._bodies: Optional[Tuple[datetime, Dict[str, PrecompressedBody]]] = None
+
+    def get_entry(self) -> Optional[CacheEntry]:
+        """get the cache entry, or None if it's stale or not set"""
+        entry = self.backend.get()
+        if entry is None:
+            return None
+        if entry.timestamp + self.max_age < datetime.now(UTC):
+            # leave it in the backend, whoever refreshes it will overwrite it
+            return None
+        return entry
+
+    def get(self) -> Optional[ImageList]:
+        """get the cache, or None if it's stale or not set"""
+        entry = self.get_entry()
+        if entry is None:
+            return None
+        return ImageList.model_construct(images=entry.images)
+
+    def get_body(
+        self, media_type: str = JSON_MEDIA_TYPE
+    ) -> Optional[PrecompressedBody]:
+        """the cached listing as a response body, serialised once per refresh"""
+        entry = self.get_entry()
+        if entry is None:
+            return None
+        return self.body_for(entry, media_type)
+
+    def body_for(self, entry: CacheEntry, media_type: str) -> PrecompressedBody:
+        """the response body for a given entry, serialised the first time it's asked for"""
+        if self._bodies is None or self._bodies[0] != entry.timestamp:
+            self._bodies = (entry.timestamp, {})
+        bodies = self._bodies[1]
+        if media_type not in bodies:
+            if media_type == MSGPACK_MEDIA_TYPE:
+                content = pack_listing(entry.images)
+            else:
+                content = (
+                    ImageList.model_construct(images=entry.images)
+                    .model_dump_json()
+                    .encode("utf-8")
+                )
+            bodies[media_type] = PrecompressedBody(content)
+        return bodies[media_type]
+
+    def clear(self) -> None:
+        """clear the cache"""
+        self.backend.clear()
+        self._bodies = None
+
+    def set(self, value: ImageList) -> CacheEntry:
+        """set the cache, returns the new entry"""
+        entry = CacheEntry(timestamp=datetime.now(UTC), images=value.images)
+        self.backend.set(entry)
+        return entry
+
+
+meme_cache = MemeCache(
+    max_age=timedelta(seconds=meme_config.cache_max_age_seconds),
+    backend=cache_backend_from_config(meme_config),
+)
+
+s3_monitor = S3Monitor(interval=meme_config.readiness_check_interval_seconds)
+
+HTML_MEDIA_TYPE = "text/html; charset=utf-8"
+
+
+class ImageInfoPage(BaseModel):
+    """a rendered /image_info page and what it was rendered from"""
+
+    template_version: str
+    source_etag: Optional[str]
+    # when we last checked the original in the bucket, from time.monotonic()
+    checked_at: float
+    body: PrecompressedBody
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+# rendered /image_info pages, by filename
+image_info_pages: LRUCache[str, ImageInfoPage] = LRUCache(
+    max_entries=meme_config.image_info_cache_size
+)
+
+# rendered pages of thumbnails for /thumbnails
+thumbnail_bundles: LRUCache[Tuple[str, ...], PrecompressedBody] = LRUCache(
+    max_entries=meme_config.thumbnail_bundle_cache_size
+)
+
+
+async def list_bucket_images() -> Optional[ImageList]:
+    """pulls the list of images from the bucket, returns None if that failed"""
+    session = get_aioboto3_session(meme_config)
+
+    try:
+        if meme_config.endpoint_url is not None:
+            async with session.resource(
+                "s3", endpoint_url=meme_config.endpoint_url
+            ) as s3_resource:
+                bucket = await s3_resource.Bucket(meme_config.bucket)
+                return ImageList(
+                    images=[
+                        image.key
+                        async for image in bucket.objects.iterator()
+                        if not image.key.startswith(THUMBNAIL_BUCKET_PREFIX)
+                    ]
+                )
+        else:
+            async with session.resource("s3") as s3_resource:
+                bucket = await s3_resource.Bucket(meme_config.bucket)
+                return ImageList(
+                    images=[
+                        image.key
+                        async for image in bucket.objects.iterator()
+                        if not image.key.startswith(THUMBNAIL_BUCKET_PREFIX)
+                    ]
+                )
+    except ClientError as error:
+        if error.response.get("Error", {}).get("Code") != "NoSuchBucket":
+            logging.error("ClientError pulling images: %s", error)
+    return None
+
+
+async def current_listing() -> Optional[CacheEntry]:
+    """the cached listing, refreshed from the bucket if it's stale, None if that failed"""
+    entry = meme_cache.get_entry()
+    if entry is not None:
+        return entry
+
+    # only one refresh at a time, across workers if the backend is shared
+    async with meme_cache.backend.lock():
+        # someone else may have refreshed it while we were waiting
+        entry = meme_cache.get_entry()
+        if entry is None:
+            res = await list_bucket_images()
+            if res is None:
+                return None
+            # use what we've got even if the backend couldn't store it
+            entry = meme_cache.set(res)
+    return entry
+
+
+def cached_body_response(
+    request: Request,
+    body: PrecompressedBody,
+    media_type: str,
+    cache_control: str = "no-cache",
+) -> Response:
+    """sends a pre-serialised body, compressed if the client accepts it, or a 304 if they already have it"""
+    encoding = body.negotiate(request.headers.get("accept-encoding"))
+    etag = body.etag(encoding)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=body.body(encoding),
+        media_type=media_type,
+        headers=headers,
+    )
+
+
+@app.get(
+    "/allimages",
+    response_model=ImageList,
+    responses={200: {"content": {MSGPACK_MEDIA_TYPE: {}}}, 304: {}},
+)
+async def get_allimages(request: Request) -> Response:
+    """returns all the images
+
+    send `Accept: application/vnd.memes-api.imagelist+msgpack` for the compact front-coded encoding
+    """
+    media_type = listing_media_type(request.headers.get("accept"))
+    entry = await current_listing()
+    if entry is None:
+        return Response(
+            content=ImageList(images=[]).model_dump_json(),
+            media_type=JSON_MEDIA_TYPE,
+        )
+    # "no-cache" means clients can keep it, but have to check it's still current
+    return cached_body_response(
+        request, meme_cache.body_for(entry, media_type), media_type
+    )
+
+
+async def upload_thumbnail(filename: str, reader: BytesIO) -> None:
+    """saves a freshly generated thumbnail to s3, runs after the response has gone out"""
+    async with get_aioboto3_session(meme_config).client(
+        "s3",
+        endpoint_url=meme_config.endpoint_url,
+    ) as s3_client:
+        await save_thumbnail(s3_client, filename, reader)
+
+
+async def get_stored_thumbnail(
+    s3_client: Any, filename: str
+) -> Optional[Tuple[bytes, Optional[str]]]:
+    """the content and ETag of a pre-cached thumbnail, or None if there isn't one"""
+    async with worker_resources.s3_slot():
+        try:
+            image_object = await s3_client.get_object(
+                Bucket=meme_config.bucket,
+                Key=f"{THUMBNAIL_BUCKET_PREFIX}{filename}",
+            )
+        except ClientError:
+            # thumbnail wasn't found, or wasn't loadable
+            return None
+        if "Body" not in image_object:
+            return None
+        return await image_object["Body"].read(), image_object.get("ETag")
+
+
+async def make_thumbnail(s3_client: Any, filename: str) -> Optional[ThumbnailData]:
+    """pulls the original and thumbnails it, None if there's no body
+
+    raises ClientError if the pull fails and SourceTooLarge if the original is too big
+    """
+    async with worker_resources.thumbnail_slot():
+        async with worker_resources.s3_slot():
+            image_object = await s3_client.get_object(
+                Bucket=meme_config.bucket, Key=filename
+            )
+            if "Body" not in image_object:
+                return None
+            source = await read_source(
+                image_object["Body"],
+                meme_config.thumbnail_max_source_bytes,
+                image_object.get("ContentLength"),
+            )
+        try:
+            return await worker_resources.run_thumbnail_job(generate_thumbnail, source)
+        finally:
+            # let go of the original as soon as we can
+            source.close()
+
+
+@app.get("/thumbnail/{filename}", response_model=None)
+async def get_thumbnail(request: Request, filename: str) -> Response:
+    """returns an image thumbnailed
+
+    first it tries to pull a pre-cached thumbnail and just returns that
+
+    if not, it'll pull the original image and make a thumb from that
+    """
+    client = client_address(request)
+    worker_resources.check_cached(client)
+    async with get_aioboto3_session(meme_config).client(
+        "s3",
+        endpoint_url=meme_config.endpoint_url,
+    ) as s3_client:
+        stored = await get_stored_thumbnail(s3_client, filename)
+        if stored is not None:
+            content, etag = stored
+            headers = {"Cache-Control": "max-age=86400"}
+            if etag is not None:
+                headers["ETag"] = etag
+            return Response(content, media_type="image/jpeg", headers=headers)
+
+        worker_resources.check_cold(client)
+        try:
+            thumbnail_data = await make_thumbnail(s3_client, filename)
+            if thumbnail_data is None:
+                return HTMLResponse(status_code=404)
+        except ClientError as error_message:
+            error_code = error_message.response.get("Error", {}).get("Code")
+            if error_code in ["404", "NoSuchKey"]:
+                response_status = 404
+                error_text = f"File not found '{filename}'"
+            else:
+                error_text = f"ClientError pulling image for thumbnail '{filename}': {error_message}"
+                print(error_text, file=sys.stderr)
+                response_status = 500
+                if "ResponseMetadata" in error_message.response:
+                    if "HTTPStatusCode" in error_message.response["ResponseMetadata"]:
+                        response_status = error_message.response["ResponseMetadata"][
+                            "HTTPStatusCode"
+                        ]
+            return HTMLResponse(error_text, status_code=response_status)
+        except SourceTooLarge as error_message:
+            logging.warning("Not thumbnailing '%s': %s", filename, error_message)
+            return HTMLResponse(
+                f"Image too large to thumbnail '{filename}'", status_code=413
+            )
+
+    imghash = thumbnail_data.hash
+    headers = {
+        "ETag": f'W/"{imghash}"',
+        "Cache-Control": "max-age=86400",
+    }
+    # the same buffer goes out in the response and then up to s3
+    return Response(
+        content=thumbnail_data.reader.getbuffer(),
+        media_type="image/jpeg",
+        headers=headers,
+        background=BackgroundTask(upload_thumbnail, filename, thumbnail_data.reader),
+    )
+
+
+async def bundle_line(  # pylint: disable=too-many-return-statements
+    s3_client: Any, filename: str, client: Optional[str]
+) -> Dict[str, str]:
+    """one line of a thumbnail bundle, generating and saving the thumbnail if it's not stored yet"""
+    try:
+        stored = await get_stored_thumbnail(s3_client, filename)
+        if stored is not None:
+            content = stored[0]
+        else:
+            worker_resources.check_cold(client)
+            thumbnail_data = await make_thumbnail(s3_client, filename)
+            if thumbnail_data is None:
+                return {"image": filename, "error": "not found"}
+            content = thumbnail_data.reader.getvalue()
+            await save_thumbnail(s3_client, filename, thumbnail_data.reader)
+    except ClientError as error_message:
+        error_code = error_message.response.get("Error", {}).get("Code")
+        if error_code in ["404", "NoSuchKey"]:
+            return {"image": filename, "error": "not found"}
+        logging.error("ClientError bundling thumbnail '%s': %s", filename, error_message)
+        return {"image": filename, "error": "failed to load"}
+    except (SourceTooLarge, OSError) as error_message:
+        logging.warning("Not bundling thumbnail '%s': %s", filename, error_message)
+        return {"image": filename, "error": "failed to thumbnail"}
+    except RateLimited:
+        return {"image": filename, "error": "rate limited"}
+    except Overloaded:
+        return {"image": filename, "error": "overloaded"}
+    return {"image": filename, "thumbnail": b64encode(content).decode("ascii")}
+
+
+@app.get("/thumbnails", response_model=None)
+async def get_thumbnails(
+    request: Request,
+    page: Optional[int] = None,
+    image: Annotated[Optional[List[str]], Query()] = None,
+) -> Response:
+    """returns a page of thumbnails in one go, as newline-delimited JSON
+
+    either pass up to a page's worth of `image` parameters, or a `page` number of the
+    full listing (defaults to the first page). Each line is
+    `{"image": filename, "thumbnail": base64 jpeg}` or `{"image": filename, "error": reason}`
+    """
+    client = client_address(request)
+    worker_resources.check_cached(client)
+    if image:
+        if len(image) > THUMBNAILS_PER_PAGE:
+            return HTMLResponse(
+                f"At most {THUMBNAILS_PER_PAGE} images per request", status_code=400
+            )
+        filenames = image
+        # the thumbnail for a filename doesn't change, so these can be cached like the thumbnails
+        cache_key: Tuple[str, ...] = ("images", *image)
+        cache_control = "max-age=86400"
+    else:
+        page = page if page is not None else 1
+        if page < 1:
+            return HTMLResponse("Pages start at 1", status_code=400)
+        entry = await current_listing()
+        if entry is None:
+            filenames = []
+        else:
+            start = (page - 1) * THUMBNAILS_PER_PAGE
+            filenames = entry.images[start : start + THUMBNAILS_PER_PAGE]
+        # the listing's contents decide what's on the page
+        cache_key = ("page", str(page), *filenames)
+        cache_control = "no-cache"
+
+    bundle = thumbnail_bundles.get(cache_key)
+    if bundle is None:
+        async with get_aioboto3_session(meme_config).client(
+            "s3",
+            endpoint_url=meme_config.endpoint_url,
+        ) as s3_client:
+            lines = await asyncio.gather(
+                *[bundle_line(s3_client, filename, client) for filename in filenames]
+            )
+        bundle = PrecompressedBody(
+            "".join(f"{json.dumps(line)}\n" for line in lines).encode("utf-8")
+        )
+        # a missing or broken original stays that way, anything else might not
+        if not any(line.get("error") in TRANSIENT_BUNDLE_ERRORS for line in lines):
+            thumbnail_bundles.set(cache_key, bundle)
+    return cached_body_response(
+        request, bundle, "application/x-ndjson", cache_control=cache_control
+    )
+
+
+def render_image_info(filename: str, image_object: Dict[str, Any]) -> Optional[bytes]:
+    """renders the image info page, using the head_object response for the original, None if that failed"""
+    jinja2_env = get_jinja2_env()
+    try:
+        template = jinja2_env.get_template("view_image.html")
+    except jinja2.exceptions.TemplateNotFound as template_error:
+        print(f"Failed to load template: {template_error}", file=sys.stderr)
+        return None
+
+    image_path = quote(filename)
+    context = default_page_render_context()
+    context["image"] = filename
+    context["image_path"] = image_path
+    context["image_type"] = image_object.get("ContentType")
+    context["image_size"] = image_object.get("ContentLength")
+    context["og_image"] = f"{context['baseurl']}/thumbnail/{image_path}"
+    # the preview is always one of our thumbnails
+    context["og_image_type"] = "image/jpeg"
+    context["og_image_width"], context["og_image_height"] = THUMBNAIL_DIMENSIONS
+    context["image_url"] = f"{context['baseurl']}/image/{image_path}"
+    context["page_title"] = f"Memes! - {filename}"
+    return template.render(**context).encode("utf-8")
+
+
+@app.get("/image_info/{filename}", response_model=None)
+async def get_image_info(request: Request, filename: str) -> Response:
+    """gets the image info page
+
+    pages are rendered once and kept until the template or the original changes, and we
+    only go back to the bucket to check the original every `image_info_recheck_seconds`
+    """
+    client = client_address(request)
+    worker_resources.check_cached(client)
+
+    version = template_version()
+    page = image_info_pages.get(filename)
+    if (
+        page is not None
+        and page.template_version == version
+        and time.monotonic() - page.checked_at < meme_config.image_info_recheck_seconds
+    ):
+        return cached_body_response(request, page.body, HTML_MEDIA_TYPE)
+
+    # anything past here goes to the bucket, and maybe renders the page
+    worker_resources.check_cold(client)
+
+    session = get_aioboto3_session(meme_config)
+
+    async with session.client("s3", endpoint_url=meme_config.endpoint_url) as s3_client:
+        try:
+            async with worker_resources.s3_slot():
+                image_object = await s3_client.head_object(
+                    Bucket=meme_config.bucket, Key=filename
+                )
+        except ClientError as error_message:
+            error_code = error_message.response.get("Error", {}).get("Code")
+            if error_code in ("404", "NoSuchKey"):
+                image_info_pages.pop(filename)
+                return HTMLResponse(f"File not found '{filename}'", status_code=404)
+            logging.error(
+                "error accessing bucket=%s key=%s url=/image_info/%s - %s %s",
+                meme_config.bucket,
+                filename,
+                filename,
+                error_message,
+                error_message.response,
+            )
+            return HTMLResponse("Something in the backend broke!", status_code=500)
+
+    source_etag = image_object.get("ETag")
+    if (
+        page is None
+        or page.template_version != version
+        or page.source_etag != source_etag
+    ):
+        content = render_image_info(filename, image_object)
+        if content is None:
+            return HTMLResponse("Failed to render page, sorry!", status_code=500)
+        page = ImageInfoPage(
+            template_version=version,
+            source_etag=source_etag,
+            checked_at=time.monotonic(),
+            body=PrecompressedBody(content),
+        )
+    else:
+        page.checked_at = time.monotonic()
+    image_info_pages.set(filename, page)
+    return cached_body_response(request, page.body, HTML_MEDIA_TYPE)
+
+
+@app.get("/image/{filename}", response_model=None)
+async def get_image(
+    request: Request, filename: str
+) -> Union[HTMLResponse, StreamingResponse]:
+    """returns an image"""
+    client = client_address(request)
+    worker_resources.check_cached(client)
+    # every original comes straight from the bucket
+    worker_resources.check_cold(client)
+    session = get_aioboto3_session(meme_config)
+
+    async with session.client("s3", endpoint_url=meme_config.endpoint_url) as s3_client:
+        try:
+            async with worker_resources.s3_slot():
+                image_object = await s3_client.get_object(
+                    Bucket=meme_config.bucket, Key=filename
+                )
+                ob_info = image_object["ResponseMetadata"]["HTTPHeaders"]
+                if "Body" in image_object:
+                    content = await image_object["Body"].read()
+                else:
+                    print("Couldn't find body!", file=sys.stderr)
+                    return HTMLResponse(status_code=404)
+        except ClientError as error_message:
+            if error_message.response.get("Error", {}).get("Code") == "NoSuchKey":
+                response_status = 404
+                error_text = f"File not found '{filename}'"
+            else:
+                response_status = 500
+                error_text = f"ClientError pulling '{filename}': {error_message}"
+                print(error_text, file=sys.stderr)
+                if "ResponseMetadata" in error_message.response:
+                    if "HTTPStatusCode" in error_message.response["ResponseMetadata"]:
+                        response_status = error_message.response["ResponseMetadata"][
+                            "HTTPStatusCode"
+                        ]
+            return HTMLResponse(error_text, status_code=response_status)
+    headers = {
+        "content_type": ob_info["content-type"],
+        "content_length": ob_info["content-length"],
+    }
+    return StreamingResponse(BytesIO(content), headers=headers)
+
+
+@app.get("/static/js/{filename}", response_model=None)
+async def get_js_by_filename(request: Request, filename: str) -> Response:
+    """return a js file"""
+    return static_response(request, "js", filename)
+
+
+@app.get("/static/css/{filename}", response_model=None)
+async def get_css_by_filename(request: Request, filename: str) -> Response:
+    """return the css file"""
+    return static_response(request, "css", filename)
+
+
+@app.get("/static/images/{filename}", response_model=None)
+async def get_static_image_by_filename(request: Request, filename: str) -> Response:
+    """return the filename file"""
+    return static_response(request, "images", filename)
+
+
+@app.get("/robots.txt", response_model=None)
+async def get_robotstxt() -> HTMLResponse:
+    """robots.txt file"""
+    return HTMLResponse(
+        """User-agent: *
+"""
+    )
+
+
+@app.get("/up", response_model=None)
+async def get_healthcheck() -> HTMLResponse:
+    """healthcheck endpoint"""
+    return HTMLResponse("OK")
+
+
+async def check_bucket() -> None:
+    """raises if the bucket isn't reachable"""
+    async with get_aioboto3_session(meme_config).client(
+        "s3",
+        endpoint_url=meme_config.endpoint_url,
+    ) as s3_client:
+        await s3_client.head_bucket(Bucket=meme_config.bucket)
+
+
+def readiness_report() -> ReadinessReport:
+    """how this worker's doing, from what's already known rather than checking anything"""
+    s3_status = s3_monitor.status()
+
+    entry = meme_cache.backend.get()
+    if entry is None:
+        listing_status = ListingStatus(cached=False, age_seconds=None, fresh=False)
+    else:
+        age = datetime.now(UTC) - entry.timestamp
+        listing_status = ListingStatus(
+            cached=True,
+            age_seconds=age.total_seconds(),
+            fresh=age <= meme_cache.max_age,
+        )
+
+    thumbnail_status = ThumbnailStatus(
+        threads=worker_resources.thumbnail_threads,
+        running=worker_resources.thumbnail_jobs - worker_resources.thumbnail_queue_depth,
+        queued=worker_resources.thumbnail_queue_depth,
+    )
+
+    reasons = []
+    if not s3_status.reachable:
+        reasons.append("bucket isn't reachable")
+    if thumbnail_status.queued > meme_config.readiness_max_thumbnail_queue:
+        reasons.append("too many thumbnails queued")
+    return ReadinessReport(
+        ready=not reasons,
+        reasons=reasons,
+        s3=s3_status,
+        listing=listing_status,
+        thumbnails=thumbnail_status,
+    )
+
+
+@app.get(
+    "/ready",
+    response_model=ReadinessReport,
+    responses={503: {"model": ReadinessReport}},
+)
+async def get_readiness() -> Response:
+    """readiness endpoint, returns a 503 if this worker shouldn't be sent traffic
+
+    the bucket is checked in the background, this only reports the last result
+    """
+    if s3_monitor.checked_at is None:
+        # nothing's reported yet, probably because the lifespan hook didn't run
+        await s3_monitor.check(check_bucket)
+    report = readiness_report()
+    return Response(
+        content=report.model_dump_json(),
+        media_type=JSON_MEDIA_TYPE,
+        status_code=200 if report.ready else 503,
+        headers={"Cache-Control": "no-store"},
+    )
+
+
+@app.get("/", response_model=None)
+async def get_homepage() -> HTMLResponse:  # pylint: disable=invalid-name
+    """homepage"""
+    jinja2_env = get_jinja2_env()
+    try:
+        template = jinja2_env.get_template("index.html")
+        context = default_page_render_context()
+        context["enable_search"] = True
+        new_filecontents = template.render(**context)
+        return HTMLResponse(new_filecontents)
+
+    except jinja2.exceptions.TemplateNotFound as template_error:
+        print(f"Failed to load template: {template_error}", file=sys.stderr)
+    return HTMLResponse("Something went wrong, sorry.", status_code=500)
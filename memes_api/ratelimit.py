@@ -0,0 +1,78 @@
+"""admission control for the expensive routes
+
+Each client IP gets two token buckets, a generous one charged on every request
+to an image route, and a tight one charged only when a request has to do real
+work (pull an original from S3, generate a thumbnail). Behind a proxy, run with
+`--proxy-headers` so the client IP is the real one rather than the proxy's.
+
+The buckets live in each worker process, so each worker gets an even share of
+the configured budget. A client spread across every worker gets the whole of
+it, one stuck on a single keep-alive connection only gets that worker's share.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class RateLimited(Exception):
+    """the client has used up its budget, they should come back in retry_after seconds"""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limited, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """we're too busy to take the request on at all"""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Overloaded, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:  # pylint: disable=too-few-public-methods
+    """refills at `rate` tokens a second, up to `burst`"""
+
+    def __init__(self, rate: float, burst: int) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> float:
+        """takes `cost` tokens and returns 0, or returns how many seconds until there'll be enough"""
+        now = time.monotonic()
+        self.tokens = min(float(self.burst), self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        if self.rate <= 0:
+            return 60.0
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:  # pylint: disable=too-few-public-methods
+    """a token bucket per client, forgetting the least recently seen clients past max_clients"""
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.buckets: OrderedDict[str, TokenBucket] = OrderedDict()
+
+    def check(self, client: Optional[str], cost: float = 1.0) -> None:
+        """charges the client, raises RateLimited if they're over budget"""
+        key = client or "unknown"
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst)
+            self.buckets[key] = bucket
+            while len(self.buckets) > self.max_clients:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        retry_after = bucket.take(cost)
+        if retry_after > 0:
+            raise RateLimited(retry_after)
@@ -0,0 +1,103 @@
+"""readiness, as opposed to /up which only says the process is running
+
+Each worker runs a background task which checks the bucket is reachable every
+`readiness_check_interval_seconds`, so a probe only reads the last result
+instead of making its own trip to S3.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from pydantic import BaseModel
+
+
+class S3Status(BaseModel):
+    """what the last bucket check found"""
+
+    reachable: bool
+    checked_seconds_ago: Optional[float]
+    error: Optional[str]
+
+
+class ListingStatus(BaseModel):
+    """the cached bucket listing"""
+
+    cached: bool
+    age_seconds: Optional[float]
+    fresh: bool
+
+
+class ThumbnailStatus(BaseModel):
+    """the thumbnail thread pool"""
+
+    threads: int
+    running: int
+    queued: int
+
+
+class ReadinessReport(BaseModel):
+    """what /ready returns"""
+
+    ready: bool
+    reasons: List[str]
+    s3: S3Status
+    listing: ListingStatus
+    thumbnails: ThumbnailStatus
+
+
+class S3Monitor:
+    """keeps the result of the last bucket check"""
+
+    def __init__(self, interval: float = 15.0) -> None:
+        self.interval = interval
+        self.reachable = False
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def check(self, check_bucket: Callable[[], Awaitable[None]]) -> None:
+        """runs one check, which should raise if the bucket isn't reachable"""
+        try:
+            await asyncio.wait_for(check_bucket(), self.interval)
+        except Exception as error:  # pylint: disable=broad-except
+            if self.reachable or self.checked_at is None:
+                logging.warning("Bucket isn't reachable: %s", error)
+            self.reachable = False
+            self.error = str(error) or error.__class__.__name__
+        else:
+            self.reachable = True
+            self.error = None
+        self.checked_at = time.monotonic()
+
+    async def run(self, check_bucket: Callable[[], Awaitable[None]]) -> None:
+        """checks forever"""
+        while True:
+            await self.check(check_bucket)
+            await asyncio.sleep(self.interval)
+
+    def start(self, check_bucket: Callable[[], Awaitable[None]]) -> None:
+        """starts checking in the background"""
+        self._task = asyncio.create_task(self.run(check_bucket))
+
+    async def stop(self) -> None:
+        """stops the background checks"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> S3Status:
+        """the last result, which doesn't count as reachable if the checks have stopped happening"""
+        if self.checked_at is None:
+            return S3Status(reachable=False, checked_seconds_ago=None, error=None)
+        age = time.monotonic() - self.checked_at
+        if age > self.interval * 3:
+            return S3Status(
+                reachable=False, checked_seconds_ago=age, error="Check is overdue"
+            )
+        return S3Status(reachable=self.reachable, checked_seconds_ago=age, error=self.error)
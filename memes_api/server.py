@@ -0,0 +1,125 @@
+"""the memes-api command, kept away from the app so starting it doesn't import the whole web stack
+
+uvicorn imports `memes_api.main:app` itself, in each worker process.
+"""
+
+import logging
+import os
+from pathlib import Path
+import sys
+from typing import Any, Dict, Optional
+
+import click
+
+from .config import CONFIG_ENV_VAR, WORKERS_ENV_VAR, MemeConfig, meme_config_load
+
+
+def setup_logging(level: int = logging.DEBUG) -> None:
+    """sets up logging."""
+    logging.basicConfig(
+        format="%(asctime)s %(levelname)s %(message)s",
+        level=level,
+        handlers=[
+            logging.StreamHandler(sys.stderr),
+        ],
+    )
+
+
+@click.command()
+@click.option("--host", type=str, default="0.0.0.0")
+@click.option("--port", type=int, default=8000)
+@click.option("--config", help="Config path")
+@click.option("--proxy-headers", is_flag=True, help="Turn on proxy headers")
+@click.option("--reload", is_flag=True)
+@click.option("--debug", is_flag=True)
+@click.option(
+    "--workers", type=int, help="Worker processes, defaults to the number of CPUs"
+)
+@click.option("--loop", type=click.Choice(["auto", "asyncio", "uvloop"]))
+@click.option("--http", type=click.Choice(["auto", "h11", "httptools"]))
+@click.option("--timeout-keep-alive", type=int, help="Keep-alive timeout in seconds")
+@click.option(
+    "--limit-concurrency",
+    type=int,
+    help="Max concurrent connections per worker before returning 503",
+)
+@click.option(
+    "--timeout-graceful-shutdown",
+    type=int,
+    help="Seconds to wait for requests to finish on shutdown",
+)
+@click.option("--backlog", type=int, help="Max queued connections")
+def cli(  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    proxy_headers: bool = False,
+    reload: bool = False,
+    debug: bool = False,
+    config: Optional[str] = None,
+    workers: Optional[int] = None,
+    loop: Optional[str] = None,
+    http: Optional[str] = None,
+    timeout_keep_alive: Optional[int] = None,
+    limit_concurrency: Optional[int] = None,
+    timeout_graceful_shutdown: Optional[int] = None,
+    backlog: Optional[int] = None,
+) -> None:
+    """server"""
+    if debug:
+        setup_logging(logging.DEBUG)
+    else:
+        setup_logging(logging.INFO)
+
+    logging.debug("proxy_headers=%s", proxy_headers)
+    logging.debug("reload=%s", reload)
+    logging.debug("debug=%s", debug)
+    if config is not None:
+        meme_config = meme_config_load(Path(config))
+        # the app loads its config when uvicorn imports it, this is how it finds the same file
+        os.environ[CONFIG_ENV_VAR] = Path(config).resolve().as_posix()
+    else:
+        meme_config = MemeConfig.default()
+
+    if workers is None:
+        workers = meme_config.workers
+    if workers is None:
+        workers = os.process_cpu_count() or 1
+    if reload:
+        # uvicorn can't reload with multiple workers
+        workers = 1
+    logging.debug("workers=%s", workers)
+    # the workers split the rate limits between them
+    os.environ[WORKERS_ENV_VAR] = str(workers)
+
+    # only needed once we're actually serving, so --help doesn't pay for it
+    import uvicorn  # pylint: disable=import-outside-toplevel
+
+    uvicorn_args: Dict[str, Any] = {
+        "app": "memes_api.main:app",
+        "reload": reload,
+        "host": host,
+        "port": port,
+        "proxy_headers": proxy_headers,
+        "workers": workers,
+        "loop": loop if loop is not None else meme_config.loop,
+        "http": http if http is not None else meme_config.http,
+        "timeout_keep_alive": (
+            timeout_keep_alive
+            if timeout_keep_alive is not None
+            else meme_config.timeout_keep_alive
+        ),
+        "limit_concurrency": (
+            limit_concurrency
+            if limit_concurrency is not None
+            else meme_config.limit_concurrency
+        ),
+        "timeout_graceful_shutdown": (
+            timeout_graceful_shutdown
+            if timeout_graceful_shutdown is not None
+            else meme_config.timeout_graceful_shutdown
+        ),
+        "backlog": backlog if backlog is not None else meme_config.backlog,
+    }
+    if proxy_headers:
+        uvicorn_args["forwarded_allow_ips"] = "*"
+    uvicorn.run(**uvicorn_args)
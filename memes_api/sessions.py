@@ -1,12 +1,18 @@
 """session things"""
 
 import logging
-import aioboto3  # type: ignore
+from typing import TYPE_CHECKING
+
 from .config import MemeConfig
 
+if TYPE_CHECKING:
+    import aioboto3  # type: ignore
+
+
+def get_aioboto3_session(meme_config: MemeConfig) -> "aioboto3.Session":
+    """gets a session, aioboto3 takes a while to import so it's loaded on first use"""
+    import aioboto3  # pylint: disable=import-outside-toplevel
 
-def get_aioboto3_session(meme_config: MemeConfig) -> aioboto3.Session:
-    """gets a session"""
     logging.debug("Getting aioboto3 session meme_config=%s", meme_config)
     return aioboto3.Session(
         aws_access_key_id=meme_config.aws_access_key_id,
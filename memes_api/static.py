@@ -0,0 +1,163 @@
+"""static asset pipeline
+
+Everything in js/, css/ and images/ is read into memory once, hashed and
+pre-compressed, so serving a static file never touches the filesystem. The
+templates link to the content-hashed filenames, which are served with
+immutable caching headers; the plain filenames still work, with a short cache.
+"""
+
+import hashlib
+import mimetypes
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from .compression import available_encodings, compress
+from .utils import choose_encoding, etag_matches
+
+STATIC_BASEDIR = Path(__file__).parent.resolve()
+# images go first so the css can be rewritten to point at the hashed image urls
+STATIC_DIRECTORIES = ("images", "js", "css")
+COMPRESSIBLE_SUFFIXES = {".css", ".js", ".svg"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+CSS_IMAGE_URL = re.compile(r"/static/images/([A-Za-z0-9._-]+)")
+
+
+class StaticAsset(BaseModel):
+    """a static file, loaded into memory"""
+
+    directory: str
+    filename: str
+    hashed_filename: str
+    media_type: str
+    digest: str
+    content: bytes
+    # pre-compressed copies, keyed by content-encoding
+    encoded: Dict[str, bytes]
+
+    @property
+    def url(self) -> str:
+        """the content-hashed url for this asset"""
+        return f"/static/{self.directory}/{self.hashed_filename}"
+
+    def representation(
+        self, accept_encoding: Optional[str]
+    ) -> Tuple[bytes, Optional[str], str]:
+        """returns the body, content-encoding and etag to send for a given Accept-Encoding header"""
+        encoding = choose_encoding(accept_encoding, list(self.encoded.keys()))
+        if encoding is None:
+            return self.content, None, f'"{self.digest}"'
+        return self.encoded[encoding], encoding, f'"{self.digest}-{encoding}"'
+
+
+def compress_variants(content: bytes) -> Dict[str, bytes]:
+    """compressed copies of the content, skipping any which aren't smaller"""
+    variants = {
+        encoding: compress(content, encoding, best=True)
+        for encoding in available_encodings()
+    }
+    return {
+        encoding: compressed
+        for encoding, compressed in variants.items()
+        if len(compressed) < len(content)
+    }
+
+
+class StaticManifest:
+    """the static assets, keyed by (directory, filename) for both plain and hashed names"""
+
+    def __init__(self, basedir: Path = STATIC_BASEDIR) -> None:
+        self.assets: Dict[Tuple[str, str], StaticAsset] = {}
+        self.hashed: Set[Tuple[str, str]] = set()
+        for directory in STATIC_DIRECTORIES:
+            self._index_directory(basedir, directory)
+
+    def _index_directory(self, basedir: Path, directory: str) -> None:
+        for filepath in sorted((basedir / directory).iterdir()):
+            if not filepath.is_file() or filepath.name.startswith("."):
+                continue
+            content = filepath.read_bytes()
+            if directory == "css":
+                content = CSS_IMAGE_URL.sub(
+                    lambda match: self.url_for(f"images/{match.group(1)}"),
+                    content.decode("utf-8"),
+                ).encode("utf-8")
+            digest = hashlib.sha256(content).hexdigest()[:16]
+            media_type = mimetypes.guess_type(filepath.name)[0]
+            asset = StaticAsset(
+                directory=directory,
+                filename=filepath.name,
+                hashed_filename=f"{filepath.stem}.{digest}{filepath.suffix}",
+                media_type=media_type or "application/octet-stream",
+                digest=digest,
+                content=content,
+                encoded=(
+                    compress_variants(content)
+                    if filepath.suffix in COMPRESSIBLE_SUFFIXES
+                    else {}
+                ),
+            )
+            self.assets[(directory, asset.filename)] = asset
+            self.assets[(directory, asset.hashed_filename)] = asset
+            self.hashed.add((directory, asset.hashed_filename))
+
+    def get(self, directory: str, filename: str) -> Optional[StaticAsset]:
+        """look up an asset by its plain or hashed filename"""
+        return self.assets.get((directory, filename))
+
+    def is_hashed(self, directory: str, filename: str) -> bool:
+        """if the filename is a content-hashed one, and so can be cached forever"""
+        return (directory, filename) in self.hashed
+
+    def url_for(self, path: str) -> str:
+        """turns "js/memesapi.js" into the content-hashed url"""
+        directory, _, filename = path.partition("/")
+        asset = self.get(directory, filename)
+        if asset is None:
+            return f"/static/{path}"
+        return asset.url
+
+
+@lru_cache
+def get_static_manifest() -> StaticManifest:
+    """builds the manifest on first use, the app's lifespan hook calls this at startup"""
+    return StaticManifest()
+
+
+def static_url(path: str) -> str:
+    """template helper, returns the content-hashed url for a static file"""
+    return get_static_manifest().url_for(path)
+
+
+def static_response(request: Request, directory: str, filename: str) -> Response:
+    """serves a static file from the manifest"""
+    manifest = get_static_manifest()
+    asset = manifest.get(directory, filename)
+    if asset is None:
+        return Response(status_code=404)
+
+    body, encoding, etag = asset.representation(
+        request.headers.get("accept-encoding")
+    )
+    headers = {
+        "ETag": etag,
+        "Cache-Control": (
+            IMMUTABLE_CACHE_CONTROL
+            if manifest.is_hashed(directory, filename)
+            else DEFAULT_CACHE_CONTROL
+        ),
+    }
+    if asset.encoded:
+        headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,90 @@
+"""thumbnail generation
+
+On a cache miss the original is read from S3 in chunks into a single buffer
+(refusing anything bigger than `thumbnail_max_source_bytes`), Pillow decodes
+straight out of that buffer, and the JPEG it encodes is hashed as it's written.
+The one output buffer is then used for both the upload and the response.
+
+Pillow is imported on first use, so starting a worker doesn't pay for it.
+"""
+
+from collections.abc import Buffer
+from hashlib import sha1
+from io import BytesIO
+from typing import Any, Optional, Union
+
+from pydantic import BaseModel, ConfigDict
+
+from .constants import THUMBNAIL_DIMENSIONS
+
+READ_CHUNK_SIZE = 256 * 1024
+
+
+class SourceTooLarge(Exception):
+    """the original image is bigger than we're willing to thumbnail"""
+
+
+class HashingBytesIO(BytesIO):
+    """a BytesIO which keeps a running sha1 of everything written to it"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.hasher = sha1()
+
+    def write(self, buffer: Buffer, /) -> int:
+        self.hasher.update(buffer)
+        return super().write(buffer)
+
+
+class ThumbnailData(BaseModel):
+    """data returned from generate_thumbnail"""
+
+    hash: str
+    reader: BytesIO
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+
+async def read_source(
+    body: Any, max_bytes: int, content_length: Optional[int] = None
+) -> BytesIO:
+    """reads an S3 StreamingBody into one buffer in chunks, raises SourceTooLarge past max_bytes"""
+    if content_length is not None and content_length > max_bytes:
+        raise SourceTooLarge(f"{content_length} bytes is over the {max_bytes} limit")
+    buffer = BytesIO()
+    while True:
+        chunk = await body.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer.write(chunk)
+        # don't trust the content-length, someone could be lying
+        if buffer.tell() > max_bytes:
+            raise SourceTooLarge(f"Source is over the {max_bytes} byte limit")
+    buffer.seek(0)
+    return buffer
+
+
+def generate_thumbnail(content: Union[bytes, BytesIO]) -> ThumbnailData:
+    """generate a thumbnail and return a BytesIO object to read it back"""
+    # Pillow's only needed once something needs thumbnailing
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    source = BytesIO(content) if isinstance(content, bytes) else content
+    tmpstorage = HashingBytesIO()
+    with Image.open(source) as tempimage:
+        tempimage.thumbnail(THUMBNAIL_DIMENSIONS)
+        tempimage = tempimage.convert("RGB")
+        expanded = Image.new("RGB", THUMBNAIL_DIMENSIONS, (255, 255, 255))
+
+        paste_x = 0
+        paste_y = 0
+        # work out if we need to move it within the thumbnail block
+        if tempimage.height != THUMBNAIL_DIMENSIONS[0]:
+            paste_y = int((THUMBNAIL_DIMENSIONS[0] - tempimage.height) / 2)
+        if tempimage.width != THUMBNAIL_DIMENSIONS[0]:
+            paste_x = int((THUMBNAIL_DIMENSIONS[0] - tempimage.width) / 2)
+
+        expanded.paste(tempimage, (paste_x, paste_y))
+        expanded.save(tmpstorage, "JPEG")
+    tmpstorage.seek(0)
+    return ThumbnailData(hash=tmpstorage.hasher.hexdigest(), reader=tmpstorage)
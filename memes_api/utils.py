@@ -3,7 +3,7 @@
 from json import dumps as json_dumps
 from io import BytesIO
 import sys
-from typing import Any, Optional, TypedDict
+from typing import Any, Optional, Sequence, TypedDict
 
 from .config import meme_config_load
 from .constants import THUMBNAIL_BUCKET_PREFIX
@@ -19,6 +19,12 @@ class DefaultPageRenderContext(TypedDict):
     og_image: Optional[str]
     image: Optional[str]
     image_url: Optional[str]
+    image_path: Optional[str]
+    image_type: Optional[str]
+    image_size: Optional[int]
+    og_image_type: Optional[str]
+    og_image_width: Optional[int]
+    og_image_height: Optional[int]
 
 
 def default_page_render_context() -> DefaultPageRenderContext:
@@ -31,10 +37,51 @@ def default_page_render_context() -> DefaultPageRenderContext:
         "og_image": None,
         "image": None,
         "image_url": None,
+        "image_path": None,
+        "image_type": None,
+        "image_size": None,
+        "og_image_type": None,
+        "og_image_width": None,
+        "og_image_height": None,
     }
     return context
 
 
+def choose_encoding(
+    accept_encoding: Optional[str], available: Sequence[str]
+) -> Optional[str]:
+    """picks the first of `available` (in our order of preference) the client accepts, based on the Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        encoding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[encoding.strip().lower()] = quality
+    for encoding in available:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """if the If-None-Match header means the client already has this etag"""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # weak comparison, as per RFC 9110
+    return etag.removeprefix("W/") in [
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    ]
+
+
 async def save_thumbnail(
     s3_client: Any,
     filename: str,
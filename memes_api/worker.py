@@ -0,0 +1,124 @@
+"""per-worker resources, set up in each uvicorn worker process by the app's lifespan hook"""
+
+import asyncio
+import math
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Optional, TypeVar
+
+from .config import MemeConfig
+from .ratelimit import Overloaded, RateLimiter
+
+ReturnT = TypeVar("ReturnT")
+
+
+class WorkerResources:  # pylint: disable=too-many-instance-attributes
+    """things which shouldn't be shared across worker processes"""
+
+    def __init__(self) -> None:
+        self.thumbnail_threads = 2
+        self._thumbnail_executor: Optional[ThreadPoolExecutor] = None
+        # thumbnail jobs running or waiting for a thread
+        self.thumbnail_jobs = 0
+        # one per thread, held while the original is in memory
+        self.thumbnail_slots = asyncio.Semaphore(2)
+        self.rate_limit_enabled = False
+        self.cached_limiter = RateLimiter(rate=0, burst=0)
+        self.cold_limiter = RateLimiter(rate=0, burst=0)
+        self.s3_queue_timeout = 10.0
+        self.s3_slots = asyncio.Semaphore(32)
+
+    def configure(self, meme_config: MemeConfig, workers: int = 1) -> None:
+        """picks up the settings, this is cheap and doesn't start anything
+
+        the rate limits and S3 concurrency are for the whole host, so this worker takes its share of them
+        """
+        self.thumbnail_threads = meme_config.thumbnail_threads
+        self.thumbnail_slots = asyncio.Semaphore(meme_config.thumbnail_threads)
+        self.rate_limit_enabled = meme_config.rate_limit_enabled
+        self.cached_limiter = RateLimiter(
+            rate=meme_config.rate_limit_cached_per_second / workers,
+            burst=math.ceil(meme_config.rate_limit_cached_burst / workers),
+            max_clients=meme_config.rate_limit_max_clients,
+        )
+        self.cold_limiter = RateLimiter(
+            rate=meme_config.rate_limit_cold_per_second / workers,
+            burst=math.ceil(meme_config.rate_limit_cold_burst / workers),
+            max_clients=meme_config.rate_limit_max_clients,
+        )
+        self.s3_queue_timeout = meme_config.s3_queue_timeout_seconds
+        self.s3_slots = asyncio.Semaphore(
+            max(1, math.ceil(meme_config.s3_max_concurrency / workers))
+        )
+
+    def start(self, meme_config: MemeConfig, workers: int = 1) -> None:
+        """set things up for this worker, `workers` is how many are sharing the host"""
+        self.stop()
+        self.configure(meme_config, workers)
+        self._thumbnail_executor = self._new_thumbnail_executor()
+
+    def stop(self) -> None:
+        """tear things down when the worker exits"""
+        if self._thumbnail_executor is not None:
+            self._thumbnail_executor.shutdown(wait=True)
+            self._thumbnail_executor = None
+
+    @property
+    def thumbnail_executor(self) -> ThreadPoolExecutor:
+        """the thread pool for thumbnailing, created on first use if the lifespan hook didn't run"""
+        if self._thumbnail_executor is None:
+            self._thumbnail_executor = self._new_thumbnail_executor()
+        return self._thumbnail_executor
+
+    def _new_thumbnail_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=self.thumbnail_threads,
+            thread_name_prefix="thumbnail",
+        )
+
+    @asynccontextmanager
+    async def thumbnail_slot(self) -> AsyncIterator[None]:
+        """waits for a thread to be free before pulling an original, so only as many are in memory as can be worked on"""
+        self.thumbnail_jobs += 1
+        try:
+            async with self.thumbnail_slots:
+                yield
+        finally:
+            self.thumbnail_jobs -= 1
+
+    async def run_thumbnail_job(
+        self, func: Callable[..., ReturnT], *args: object
+    ) -> ReturnT:
+        """runs CPU-heavy image work off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.thumbnail_executor, func, *args)
+
+    @property
+    def thumbnail_queue_depth(self) -> int:
+        """how many thumbnail jobs are waiting for a thread"""
+        return max(0, self.thumbnail_jobs - self.thumbnail_threads)
+
+    def check_cached(self, client: Optional[str]) -> None:
+        """charges the client for a request to an image route, raises RateLimited if they're over"""
+        if self.rate_limit_enabled:
+            self.cached_limiter.check(client)
+
+    def check_cold(self, client: Optional[str]) -> None:
+        """charges the client for a request that has to do real work, raises RateLimited if they're over"""
+        if self.rate_limit_enabled:
+            self.cold_limiter.check(client)
+
+    @asynccontextmanager
+    async def s3_slot(self) -> AsyncIterator[None]:
+        """caps how many S3 fetches this worker has in flight, raises Overloaded if we can't get a slot in time"""
+        try:
+            await asyncio.wait_for(self.s3_slots.acquire(), self.s3_queue_timeout)
+        except TimeoutError as error:
+            raise Overloaded(retry_after=self.s3_queue_timeout) from error
+        try:
+            yield
+        finally:
+            self.s3_slots.release()
+
+
+worker_resources = WorkerResources()
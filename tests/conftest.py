@@ -0,0 +1,20 @@
+""" shared test fixtures """
+
+from typing import Iterator
+
+import pytest
+
+from memes_api.main import s3_monitor
+
+
+async def reachable_bucket() -> None:
+    """stands in for the real bucket check, so /ready doesn't depend on S3"""
+
+
+@pytest.fixture(autouse=True)
+def stub_bucket_check(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """every test starts with an unchecked monitor whose bucket checks pass"""
+    monkeypatch.setattr("memes_api.main.check_bucket", reachable_bucket)
+    s3_monitor.reachable, s3_monitor.checked_at, s3_monitor.error = False, None, None
+    yield
+    s3_monitor.reachable, s3_monitor.checked_at, s3_monitor.error = False, None, None
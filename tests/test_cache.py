@@ -0,0 +1,132 @@
+""" tests the listing cache backends """
+
+import asyncio
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from memes_api import ImageList, MemeCache
+from memes_api.cache import (
+    CacheEntry,
+    FileCacheBackend,
+    InProcessCacheBackend,
+    LRUCache,
+    cache_backend_from_config,
+    default_cache_file,
+)
+from memes_api.config import WORKERS_ENV_VAR, meme_config_load
+
+
+def test_in_process_cache() -> None:
+    """tests the default backend"""
+    cache = MemeCache(max_age=timedelta(minutes=1))
+    assert isinstance(cache.backend, InProcessCacheBackend)
+    assert cache.get() is None
+    cache.set(ImageList(images=["hello.jpg"]))
+    result = cache.get()
+    assert result is not None
+    assert result.images == ["hello.jpg"]
+    cache.clear()
+    assert cache.get() is None
+
+
+def test_cache_expiry() -> None:
+    """stale entries aren't returned"""
+    cache = MemeCache(max_age=timedelta(minutes=1))
+    cache.backend.set(
+        CacheEntry(
+            timestamp=datetime.now(UTC) - timedelta(minutes=2), images=["old.jpg"]
+        )
+    )
+    assert cache.get() is None
+
+
+def test_file_cache_is_shared(tmp_path: Path) -> None:
+    """two workers pointing at the same file see each other's listing"""
+    cachefile = tmp_path / "listing.json"
+    worker_one = MemeCache(max_age=timedelta(minutes=1), backend=FileCacheBackend(cachefile))
+    worker_two = MemeCache(max_age=timedelta(minutes=1), backend=FileCacheBackend(cachefile))
+
+    assert worker_two.get() is None
+    worker_one.set(ImageList(images=["a.jpg", "b.png"]))
+    result = worker_two.get()
+    assert result is not None
+    assert result.images == ["a.jpg", "b.png"]
+
+    worker_two.clear()
+    assert worker_one.get() is None
+
+
+def test_file_cache_lock(tmp_path: Path) -> None:
+    """only one holder of the refresh lock at a time"""
+    cachefile = tmp_path / "listing.json"
+    backends = [FileCacheBackend(cachefile, poll_interval=0.01) for _ in range(3)]
+    holding: List[bool] = []
+    overlapped: List[bool] = []
+
+    async def refresh(backend: FileCacheBackend) -> None:
+        async with backend.lock():
+            if holding:
+                overlapped.append(True)
+            holding.append(True)
+            await asyncio.sleep(0.05)
+            holding.pop()
+
+    async def run_all() -> None:
+        await asyncio.gather(*[refresh(backend) for backend in backends])
+
+    asyncio.run(run_all())
+    assert not overlapped
+
+
+def test_lru_cache() -> None:
+    """the least recently used entry goes first"""
+    cache: LRUCache[str, int] = LRUCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_default_cache_file() -> None:
+    """deployments using different buckets don't share a listing"""
+    first = meme_config_load()
+    second = first.model_copy(update={"bucket": f"{first.bucket}-other"})
+    assert default_cache_file(first) != default_cache_file(second)
+    assert default_cache_file(first) == default_cache_file(first.model_copy())
+
+
+def test_file_cache_unwritable(tmp_path: Path) -> None:
+    """a cache file we can't write to is logged, not raised"""
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("", encoding="utf-8")
+    cache = MemeCache(
+        max_age=timedelta(minutes=1),
+        backend=FileCacheBackend(blocker / "listing.json"),
+    )
+    entry = cache.set(ImageList(images=["a.jpg"]))
+    assert entry.images == ["a.jpg"]
+    assert cache.get() is None
+
+    async def locked() -> None:
+        async with cache.backend.lock():
+            pass
+
+    asyncio.run(locked())
+
+
+def test_backend_follows_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    """several workers share the listing unless the config says otherwise"""
+    config = meme_config_load().model_copy(update={"cache_backend": None})
+    monkeypatch.setenv(WORKERS_ENV_VAR, "1")
+    assert isinstance(cache_backend_from_config(config), InProcessCacheBackend)
+    monkeypatch.setenv(WORKERS_ENV_VAR, "4")
+    assert isinstance(cache_backend_from_config(config), FileCacheBackend)
+    config.cache_backend = "memory"
+    assert isinstance(cache_backend_from_config(config), InProcessCacheBackend)
@@ -1,7 +1,12 @@
 """ testing click functionality """
 
+import os
+from typing import Any, Dict
+
+import pytest
 from click.testing import CliRunner
 from memes_api import cli
+from memes_api.config import WORKERS_ENV_VAR
 
 def test_command_help() -> None:
     """ test that something works using click """
@@ -9,3 +14,41 @@ def test_command_help() -> None:
     result = runner.invoke(cli, ["--help"])
     assert result.exit_code == 0
     print(result)
+
+
+def test_server_options(monkeypatch: pytest.MonkeyPatch) -> None:
+    """ the tuning options make it through to uvicorn """
+    uvicorn_args: Dict[str, Any] = {}
+
+    def fake_run(**kwargs: Any) -> None:
+        uvicorn_args.update(kwargs)
+
+    monkeypatch.setattr("uvicorn.run", fake_run)
+    # the CLI passes the worker count on to the workers, don't let it leak into other tests
+    monkeypatch.setenv(WORKERS_ENV_VAR, "1")
+    runner = CliRunner()
+    result = runner.invoke(
+        cli,
+        [
+            "--workers",
+            "3",
+            "--http",
+            "h11",
+            "--timeout-keep-alive",
+            "30",
+            "--limit-concurrency",
+            "100",
+        ],
+    )
+    assert result.exit_code == 0
+    assert uvicorn_args["workers"] == 3
+    assert uvicorn_args["http"] == "h11"
+    assert uvicorn_args["loop"] == "auto"
+    assert uvicorn_args["timeout_keep_alive"] == 30
+    assert uvicorn_args["limit_concurrency"] == 100
+    assert os.environ[WORKERS_ENV_VAR] == "3"
+
+    # reload only works with a single worker
+    result = runner.invoke(cli, ["--workers", "3", "--reload"])
+    assert result.exit_code == 0
+    assert uvicorn_args["workers"] == 1
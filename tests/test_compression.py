@@ -0,0 +1,92 @@
+""" tests the selective compression middleware """
+
+from typing import Iterator
+
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from memes_api import app
+from memes_api.compression import (
+    PrecompressedBody,
+    SelectiveCompressionMiddleware,
+    available_encodings,
+)
+
+test_app = FastAPI()
+test_app.add_middleware(SelectiveCompressionMiddleware, minimum_size=100)
+
+BIG_TEXT = "memes! " * 1000
+
+
+@test_app.get("/html")
+async def html() -> HTMLResponse:
+    """a big compressible page"""
+    return HTMLResponse(BIG_TEXT)
+
+
+@test_app.get("/jpeg")
+async def jpeg() -> Response:
+    """pretend to be a thumbnail"""
+    return Response(content=b"\xff\xd8" + b"\x00" * 5000, media_type="image/jpeg")
+
+
+@test_app.get("/stream")
+async def stream() -> StreamingResponse:
+    """a streaming text response"""
+
+    def chunks() -> Iterator[str]:
+        for _ in range(10):
+            yield BIG_TEXT
+
+    return StreamingResponse(chunks(), media_type="text/plain")
+
+
+test_client = TestClient(test_app)
+
+
+def test_compresses_text() -> None:
+    """text responses get compressed with each encoding we support"""
+    for encoding in available_encodings():
+        response = test_client.get("/html", headers={"Accept-Encoding": encoding})
+        assert response.headers["content-encoding"] == encoding
+        assert response.text == BIG_TEXT
+
+
+def test_skips_images() -> None:
+    """images go through untouched, with their Content-Length"""
+    response = test_client.get("/jpeg", headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == "5002"
+
+
+def test_streaming() -> None:
+    """streaming responses are compressed as they go"""
+    response = test_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == BIG_TEXT * 10
+
+
+def test_no_accept_encoding() -> None:
+    """nothing changes if the client doesn't ask"""
+    response = test_client.get("/html", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+
+def test_precompressed_body() -> None:
+    """compressed copies get made once and reused"""
+    body = PrecompressedBody(BIG_TEXT.encode("utf-8"))
+    encoding = body.negotiate("gzip;q=0.5, br;q=0")
+    assert encoding == "gzip"
+    first = body.body(encoding)
+    assert body.body(encoding) is first
+    assert body.body(None) == BIG_TEXT.encode("utf-8")
+
+
+def test_allimages_compression() -> None:
+    """the listing can be compressed"""
+    client = TestClient(app)
+    response = client.get("/allimages", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "images" in response.json()
@@ -1,8 +1,15 @@
 """ tests that the healthcheck works """
 
+import asyncio
+import subprocess
+import sys
+
+import pytest
 from fastapi.testclient import TestClient
 
 from memes_api import app
+from memes_api.healthcheck import cli as healthcheck_cli
+from memes_api.readiness import S3Monitor
 
 client = TestClient(app)
 
@@ -12,3 +19,52 @@ def test_healthcheck() -> None:
         response = client.get("/up")
         assert response.status_code == 200
         assert response.content == b"OK"
+
+
+def test_healthcheck_imports() -> None:
+    """the healthcheck doesn't drag in the app, it runs on every container probe"""
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, memes_api.healthcheck; "
+            "print(sorted({'fastapi', 'aioboto3', 'PIL', 'memes_api.main'} & set(sys.modules)))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_ready() -> None:
+    """the worker's ready once it's seen the bucket"""
+    with TestClient(app) as ready_client:
+        response = ready_client.get("/ready")
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "no-store"
+        assert response.json()["ready"] is True
+
+
+def test_not_ready(monkeypatch: pytest.MonkeyPatch) -> None:
+    """a failed bucket check makes /ready return a 503"""
+
+    async def broken_bucket() -> None:
+        raise ConnectionError("nope")
+
+    monitor = S3Monitor(interval=1.0)
+    asyncio.run(monitor.check(broken_bucket))
+    assert monitor.status().error == "nope"
+
+    monkeypatch.setattr("memes_api.main.check_bucket", broken_bucket)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["reasons"] == ["bucket isn't reachable"]
+    assert response.json()["s3"]["error"] == "nope"
+
+
+def test_healthcheck_cli_fails() -> None:
+    """the probe exits non-zero when nothing's listening"""
+    with pytest.raises(SystemExit) as exit_info:
+        healthcheck_cli(["--ready", "--timeout", "1", "http://127.0.0.1:1/ready"])
+    assert exit_info.value.code == 1
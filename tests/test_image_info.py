@@ -0,0 +1,91 @@
+""" tests the cached image info pages """
+
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+
+from memes_api import app, meme_config
+from memes_api.main import image_info_pages
+
+client = TestClient(app)
+
+
+class FakeS3Client:
+    """answers head_object with whatever's in `objects`"""
+
+    def __init__(self) -> None:
+        self.objects: Dict[str, Dict[str, Any]] = {}
+        self.calls: List[str] = []
+
+    async def head_object(self, Bucket: str, Key: str) -> Dict[str, Any]:  # pylint: disable=invalid-name
+        """the metadata for an object"""
+        assert Bucket == meme_config.bucket
+        self.calls.append(Key)
+        return self.objects[Key]
+
+
+class FakeSession:
+    """hands out the fake client"""
+
+    def __init__(self, s3_client: FakeS3Client) -> None:
+        self.s3_client = s3_client
+
+    @asynccontextmanager
+    async def client(self, *_args: Any, **_kwargs: Any) -> AsyncIterator[FakeS3Client]:
+        """pretends to be aioboto3's client context manager"""
+        yield self.s3_client
+
+
+def test_image_info_cached(monkeypatch: pytest.MonkeyPatch) -> None:
+    """the page is rendered once, and re-rendered when the original changes"""
+    s3_client = FakeS3Client()
+    monkeypatch.setattr(
+        "memes_api.main.get_aioboto3_session", lambda _config: FakeSession(s3_client)
+    )
+    filename = f"robot {uuid4()}.jpg"
+    s3_client.objects[filename] = {
+        "ETag": '"first"',
+        "ContentType": "image/jpeg",
+        "ContentLength": 1234,
+    }
+    try:
+        response = client.get(f"/image_info/{filename}")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/html; charset=utf-8"
+        assert '<meta property="og:image:width" content="200" />' in response.text
+        assert '<meta property="og:image:type" content="image/jpeg" />' in response.text
+        assert filename.replace(" ", "%20") in response.text
+        etag = response.headers["etag"]
+        page = image_info_pages.get(filename)
+        assert page is not None
+
+        # served from the cache, without going back to the bucket
+        response = client.get(
+            f"/image_info/{filename}", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert len(s3_client.calls) == 1
+
+        # once it's due a recheck, the same ETag keeps the same page
+        page.checked_at -= meme_config.image_info_recheck_seconds
+        assert client.get(f"/image_info/{filename}").status_code == 200
+        assert len(s3_client.calls) == 2
+        assert image_info_pages.get(filename) is page
+
+        # and a new ETag means the original changed, so it's re-rendered
+        s3_client.objects[filename] = {
+            "ETag": '"second"',
+            "ContentType": "image/png",
+            "ContentLength": 5678,
+        }
+        page.checked_at -= meme_config.image_info_recheck_seconds
+        response = client.get(f"/image_info/{filename}")
+        assert response.status_code == 200
+        assert "image/png" in response.text
+        assert len(s3_client.calls) == 3
+        assert image_info_pages.get(filename) is not page
+    finally:
+        image_info_pages.clear()
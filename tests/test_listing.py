@@ -0,0 +1,61 @@
+""" tests the /allimages encodings """
+
+from fastapi.testclient import TestClient
+
+from memes_api import ImageList, app, meme_cache
+from memes_api.listing import (
+    MSGPACK_MEDIA_TYPE,
+    front_decode,
+    front_encode,
+    listing_media_type,
+    unpack_listing,
+)
+
+client = TestClient(app)
+
+IMAGES = ["cat.jpg", "memes/cat.jpg", "memes/dog.png", "memes/doggo.gif", "zebra.png"]
+
+
+def test_front_coding() -> None:
+    """front coding round-trips, and actually shares the prefixes"""
+    shared, suffixes = front_encode(IMAGES)
+    assert shared == [0, 0, 6, 9, 0]
+    assert suffixes[2] == "dog.png"
+    assert front_decode(shared, suffixes) == IMAGES
+    assert front_encode([]) == ([], [])
+
+
+def test_listing_media_type() -> None:
+    """JSON unless the client asks for msgpack"""
+    assert listing_media_type(None) == "application/json"
+    assert listing_media_type("*/*") == "application/json"
+    assert listing_media_type(f"{MSGPACK_MEDIA_TYPE}, */*;q=0.1") == MSGPACK_MEDIA_TYPE
+    assert listing_media_type(f"{MSGPACK_MEDIA_TYPE};q=0") == "application/json"
+
+
+def test_allimages_etag() -> None:
+    """the listing comes with an etag, and a 304 when it hasn't changed"""
+    meme_cache.set(ImageList(images=IMAGES))
+    try:
+        response = client.get("/allimages")
+        assert response.status_code == 200
+        assert response.json() == {"images": IMAGES}
+        etag = response.headers["etag"]
+
+        response = client.get("/allimages", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+    finally:
+        meme_cache.clear()
+
+
+def test_allimages_msgpack() -> None:
+    """clients can opt in to the compact encoding"""
+    meme_cache.set(ImageList(images=IMAGES))
+    try:
+        response = client.get("/allimages", headers={"Accept": MSGPACK_MEDIA_TYPE})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == MSGPACK_MEDIA_TYPE
+        assert unpack_listing(response.content) == IMAGES
+    finally:
+        meme_cache.clear()
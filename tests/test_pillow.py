@@ -1,8 +1,14 @@
 """ test image things """
 
+import asyncio
+from hashlib import sha1
+from io import BytesIO
 from pathlib import Path
 
+import pytest
+
 from memes_api import generate_thumbnail
+from memes_api.thumbnails import SourceTooLarge, read_source
 
 
 def test_image_thumbnail() -> None:
@@ -20,3 +26,34 @@ def test_image_thumbnail() -> None:
     thumbnail = generate_thumbnail(image_content)
 
     assert len(thumbnail.reader.read()) >= 4096
+
+
+def test_thumbnail_hash() -> None:
+    """the hash is worked out while writing, make sure it matches the output"""
+    target_image = Path(__file__).parent.resolve() / "beep-boop-i-am-a-robot.jpg"
+    with target_image.open("rb") as image_handle:
+        thumbnail = generate_thumbnail(BytesIO(image_handle.read()))
+    assert thumbnail.hash == sha1(thumbnail.reader.getvalue()).hexdigest()
+
+
+class FakeBody:
+    """pretends to be an S3 StreamingBody"""
+
+    def __init__(self, content: bytes) -> None:
+        self.reader = BytesIO(content)
+
+    async def read(self, amt: int = -1) -> bytes:
+        """read a chunk"""
+        return self.reader.read(amt)
+
+
+def test_read_source_limits() -> None:
+    """sources over the limit are refused, whether or not they admit it up front"""
+    content = b"x" * 1000
+    source = asyncio.run(read_source(FakeBody(content), max_bytes=1000))
+    assert source.getvalue() == content
+
+    with pytest.raises(SourceTooLarge):
+        asyncio.run(read_source(FakeBody(content), max_bytes=999, content_length=1000))
+    with pytest.raises(SourceTooLarge):
+        asyncio.run(read_source(FakeBody(content), max_bytes=999))
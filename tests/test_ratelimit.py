@@ -0,0 +1,153 @@
+""" tests the rate limiting and S3 admission control """
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from memes_api import app, meme_config
+from memes_api.compression import PrecompressedBody
+from memes_api.main import ImageInfoPage, image_info_pages, template_version
+from memes_api.ratelimit import Overloaded, RateLimited, RateLimiter, TokenBucket
+from memes_api.worker import WorkerResources, worker_resources
+
+client = TestClient(app)
+
+
+def test_token_bucket() -> None:
+    """the burst goes through, then you wait"""
+    bucket = TokenBucket(rate=1.0, burst=3)
+    for _ in range(3):
+        assert bucket.take() == 0
+    assert 0 < bucket.take() <= 1.0
+
+
+def test_limiter_per_client() -> None:
+    """one client running out doesn't affect another"""
+    limiter = RateLimiter(rate=0.1, burst=1, max_clients=2)
+    limiter.check("10.0.0.1")
+    with pytest.raises(RateLimited) as error:
+        limiter.check("10.0.0.1")
+    assert error.value.retry_after > 0
+    limiter.check("10.0.0.2")
+    # the oldest client gets forgotten
+    limiter.check("10.0.0.3")
+    assert list(limiter.buckets) == ["10.0.0.2", "10.0.0.3"]
+
+
+def test_rate_limited_response() -> None:
+    """over budget gets a 429 with Retry-After"""
+    enabled = worker_resources.rate_limit_enabled
+    limiter = worker_resources.cached_limiter
+    worker_resources.rate_limit_enabled = True
+    worker_resources.cached_limiter = RateLimiter(rate=0.5, burst=1)
+    try:
+        assert client.get("/thumbnail/12345").status_code == 404
+        response = client.get("/thumbnail/12345")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
+    finally:
+        worker_resources.rate_limit_enabled = enabled
+        worker_resources.cached_limiter = limiter
+
+
+def test_rate_limit_disabled() -> None:
+    """nothing gets limited when it's turned off"""
+    resources = WorkerResources()
+    resources.configure(
+        meme_config.model_copy(
+            update={"rate_limit_enabled": False, "rate_limit_cold_burst": 0}
+        )
+    )
+    for _ in range(10):
+        resources.check_cold("10.0.0.1")
+
+
+def test_split_between_workers() -> None:
+    """each worker gets its share of the limits, so the host as a whole stays within them"""
+    resources = WorkerResources()
+    resources.configure(
+        meme_config.model_copy(
+            update={
+                "rate_limit_cold_per_second": 2.0,
+                "rate_limit_cold_burst": 30,
+                "s3_max_concurrency": 2,
+            }
+        ),
+        workers=4,
+    )
+    assert resources.cold_limiter.rate == 0.5
+    assert resources.cold_limiter.burst == 8
+    # there's always at least one slot
+    assert resources.s3_slots.locked() is False
+    asyncio.run(resources.s3_slots.acquire())
+    assert resources.s3_slots.locked() is True
+
+
+def test_s3_slot_overloaded() -> None:
+    """waiting too long for an S3 slot raises Overloaded"""
+    resources = WorkerResources()
+    resources.configure(
+        meme_config.model_copy(
+            update={"s3_max_concurrency": 1, "s3_queue_timeout_seconds": 0.01}
+        )
+    )
+
+    async def fetch_twice() -> None:
+        async with resources.s3_slot():
+            async with resources.s3_slot():
+                pass
+
+    with pytest.raises(Overloaded):
+        asyncio.run(fetch_twice())
+
+
+def test_image_info_cold() -> None:
+    """a cached info page only costs the cached budget, anything else costs the cold one"""
+    enabled = worker_resources.rate_limit_enabled
+    limiter = worker_resources.cold_limiter
+    worker_resources.rate_limit_enabled = True
+    worker_resources.cold_limiter = RateLimiter(rate=0.5, burst=0)
+    image_info_pages.set(
+        "cached.jpg",
+        ImageInfoPage(
+            template_version=template_version(),
+            source_etag='"abc"',
+            checked_at=time.monotonic(),
+            body=PrecompressedBody(b"<html>cached</html>"),
+        ),
+    )
+    try:
+        assert client.get("/image_info/cached.jpg").status_code == 200
+        response = client.get("/image_info/uncached.jpg")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
+    finally:
+        worker_resources.rate_limit_enabled = enabled
+        worker_resources.cold_limiter = limiter
+        image_info_pages.clear()
+
+
+def test_thumbnail_slots() -> None:
+    """originals only get pulled when there's a thread free to thumbnail them"""
+    resources = WorkerResources()
+    resources.configure(meme_config.model_copy(update={"thumbnail_threads": 1}))
+    running = []
+
+    async def pull(name: str) -> None:
+        async with resources.thumbnail_slot():
+            running.append(name)
+            assert len(running) == 1
+            await asyncio.sleep(0.01)
+            running.remove(name)
+
+    async def pull_both() -> None:
+        first = asyncio.create_task(pull("one.jpg"))
+        second = asyncio.create_task(pull("two.jpg"))
+        await asyncio.sleep(0)
+        assert resources.thumbnail_queue_depth == 1
+        await asyncio.gather(first, second)
+        assert resources.thumbnail_jobs == 0
+
+    asyncio.run(pull_both())
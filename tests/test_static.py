@@ -0,0 +1,51 @@
+""" tests the static asset pipeline """
+
+from fastapi.testclient import TestClient
+
+from memes_api import app
+from memes_api.static import IMMUTABLE_CACHE_CONTROL, get_static_manifest
+
+client = TestClient(app)
+
+
+def test_templates_use_hashed_urls() -> None:
+    """the homepage links to the content-hashed files"""
+    js_url = get_static_manifest().url_for("js/memesapi.js")
+    assert js_url != "/static/js/memesapi.js"
+    response = client.get("/")
+    assert js_url in response.content.decode("utf-8")
+
+
+def test_hashed_asset_is_immutable() -> None:
+    """hashed urls can be cached forever, and get pre-compressed bodies"""
+    css_url = get_static_manifest().url_for("css/memesapi.css")
+    response = client.get(css_url, headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/css")
+    # the css should point at the hashed image too
+    assert (
+        get_static_manifest().url_for("images/thumbnail_background.svg")
+        in response.content.decode("utf-8")
+    )
+
+    not_modified = client.get(
+        css_url,
+        headers={
+            "Accept-Encoding": "gzip",
+            "If-None-Match": response.headers["etag"],
+        },
+    )
+    assert not_modified.status_code == 304
+
+
+def test_plain_asset_names() -> None:
+    """the un-hashed names still work, just without the long cache"""
+    response = client.get("/static/images/favicon.png")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/png"
+    assert "immutable" not in response.headers["cache-control"]
+    assert "content-encoding" not in response.headers
+
+    assert client.get("/static/images/..%2Fconfig.py").status_code == 404
@@ -0,0 +1,99 @@
+""" tests the batch thumbnail endpoint """
+
+from contextlib import asynccontextmanager
+import json
+from typing import Any, AsyncIterator, Dict, List
+
+from botocore.exceptions import ClientError
+import pytest
+from fastapi.testclient import TestClient
+
+from memes_api import app, meme_config, thumbnail_bundles
+from memes_api.compression import PrecompressedBody
+from memes_api.constants import THUMBNAILS_PER_PAGE
+
+client = TestClient(app)
+
+
+def test_too_many_thumbnails() -> None:
+    """a request can only ask for a page's worth"""
+    params = [("image", f"{number}.jpg") for number in range(THUMBNAILS_PER_PAGE + 1)]
+    response = client.get("/thumbnails", params=params)
+    assert response.status_code == 400
+
+
+def test_bad_page() -> None:
+    """pages start at 1"""
+    assert client.get("/thumbnails", params={"page": 0}).status_code == 400
+
+
+def test_cached_bundle() -> None:
+    """a cached bundle is served as-is, with an etag"""
+    line = {"image": "hello.jpg", "thumbnail": "aGVsbG8="}
+    thumbnail_bundles.set(
+        ("images", "hello.jpg"),
+        PrecompressedBody(f"{json.dumps(line)}\n".encode("utf-8")),
+    )
+    try:
+        response = client.get("/thumbnails", params={"image": "hello.jpg"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [json.loads(row) for row in response.text.splitlines()] == [line]
+
+        response = client.get(
+            "/thumbnails",
+            params={"image": "hello.jpg"},
+            headers={"If-None-Match": response.headers["etag"]},
+        )
+        assert response.status_code == 304
+    finally:
+        thumbnail_bundles.clear()
+
+
+class FailingS3Client:
+    """every get_object fails with `code`"""
+
+    def __init__(self, code: str) -> None:
+        self.code = code
+        self.calls: List[str] = []
+
+    async def get_object(self, Bucket: str, Key: str) -> Dict[str, Any]:  # pylint: disable=invalid-name
+        """fails, every time"""
+        assert Bucket == meme_config.bucket
+        self.calls.append(Key)
+        raise ClientError({"Error": {"Code": self.code}}, "GetObject")
+
+
+class FakeSession:
+    """hands out the fake client"""
+
+    def __init__(self, s3_client: FailingS3Client) -> None:
+        self.s3_client = s3_client
+
+    @asynccontextmanager
+    async def client(self, *_args: Any, **_kwargs: Any) -> AsyncIterator[FailingS3Client]:
+        """pretends to be aioboto3's client context manager"""
+        yield self.s3_client
+
+
+@pytest.mark.parametrize(
+    "code,error,cached",
+    [("NoSuchKey", "not found", True), ("InternalError", "failed to load", False)],
+)
+def test_bundle_errors(
+    monkeypatch: pytest.MonkeyPatch, code: str, error: str, cached: bool
+) -> None:
+    """a missing original won't turn up by asking again, so that's cached, other failures aren't"""
+    s3_client = FailingS3Client(code)
+    monkeypatch.setattr(
+        "memes_api.main.get_aioboto3_session", lambda _config: FakeSession(s3_client)
+    )
+    try:
+        response = client.get("/thumbnails", params={"image": "missing.jpg"})
+        assert response.status_code == 200
+        assert json.loads(response.text) == {"image": "missing.jpg", "error": error}
+        calls = len(s3_client.calls)
+        client.get("/thumbnails", params={"image": "missing.jpg"})
+        assert (len(s3_client.calls) == calls) is cached
+    finally:
+        thumbnail_bundles.clear()